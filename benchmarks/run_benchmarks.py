@@ -0,0 +1,199 @@
+"""Time each phase of repo_prompt_generator on a synthetic repository and write the results as JSON.
+
+python benchmarks/run_benchmarks.py --files 5000 --output results.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import multiprocessing
+
+from synthetic_tree import add_tree_arguments, generate_tree, tree_params
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+import repo_prompt_generator as rpg
+
+def read_proc_io():
+    try:
+        with open("/proc/self/io", "r") as file:
+            fields = dict(line.split(": ") for line in file.read().splitlines())
+        return int(fields["syscr"]), int(fields["syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM (Linux 4.0+), so the peak is the phase's own
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+def read_peak_rss_kb(was_reset):
+    if was_reset:
+        with open("/proc/self/status", "r") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    # Without a reset this includes the setup, and it is in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+# Each phase is (setup, run): setup is not measured; run is timed once per repeat and is
+# given what setup returned. Each runs in its own forked process so RSS and syscalls are its own
+def setup_tree(rpg, tree, output_dir):
+    return None
+
+def run_scan_index(rpg, tree, output_dir, state):
+    rpg.build_scan_index([tree], [])
+
+def setup_index(rpg, tree, output_dir):
+    return rpg.build_scan_index([tree], [])
+
+def run_extension_sizes(rpg, tree, output_dir, index):
+    rpg.get_extension_sizes(index)
+
+def setup_paths(rpg, tree, output_dir):
+    matcher = rpg.get_ignore_matcher(tree, [])
+    paths = []
+    for root, dirs, files in os.walk(tree):
+        paths.extend((os.path.join(root, name), True) for name in dirs)
+        paths.extend((os.path.join(root, name), False) for name in files)
+    return matcher, paths
+
+def run_should_ignore(rpg, tree, output_dir, state):
+    matcher, paths = state
+    for path, is_dir in paths:
+        rpg.should_ignore(path, matcher, tree, is_dir)
+
+def run_exclusion_scan(rpg, tree, output_dir, index):
+    total_size_kb = round(rpg.get_total_source_code_size(index, []) / 1024, 2)
+    for node in index.walk():
+        rpg.prompt_user_for_exclusion(index, node, [], total_size_kb)
+
+def run_extract(rpg, tree, output_dir, state):
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    rpg.extract_source_code(rpg.build_scan_index([tree], []), [], 1000, output_dir)
+
+def setup_previous_output(rpg, tree, output_dir):
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    rpg.extract_source_code(rpg.build_scan_index([tree], []), [], 1000, output_dir)
+
+def run_extract_incremental(rpg, tree, output_dir, state):
+    rpg.extract_source_code(rpg.build_scan_index([tree], []), [], 1000, output_dir)
+
+PHASES = {
+    "scan_index": (setup_tree, run_scan_index),
+    "get_extension_sizes": (setup_index, run_extension_sizes),
+    "should_ignore": (setup_paths, run_should_ignore),
+    "exclusion_scan": (setup_index, run_exclusion_scan),
+    "extract_source_code": (setup_tree, run_extract),
+    "extract_incremental": (setup_previous_output, run_extract_incremental),
+}
+
+def measure_phase(connection, rpg, name, tree, output_dir, repeat):
+    setup, run = PHASES[name]
+    # Prompts are answered "Include" and progress output is dropped
+    rpg.input = lambda prompt="": "i"
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = setup(rpg, tree, output_dir)
+        was_reset = reset_peak_rss()
+        io_before = read_proc_io()
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        seconds = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run(rpg, tree, output_dir, state)
+            seconds.append(time.perf_counter() - started)
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+        io_after = read_proc_io()
+    result = {
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+        "peak_rss_kb": read_peak_rss_kb(was_reset),
+        "user_seconds": (usage_after.ru_utime - usage_before.ru_utime) / repeat,
+        "system_seconds": (usage_after.ru_stime - usage_before.ru_stime) / repeat,
+        "voluntary_switches": (usage_after.ru_nvcsw - usage_before.ru_nvcsw) / repeat,
+    }
+    if io_before and io_after:
+        result["read_syscalls"] = (io_after[0] - io_before[0]) / repeat
+        result["write_syscalls"] = (io_after[1] - io_before[1]) / repeat
+    connection.send(result)
+    connection.close()
+
+def run_phase(rpg, name, tree, output_dir, repeat):
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=measure_phase, args=(sender, rpg, name, tree, output_dir, repeat))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    process.join()
+    if result is None:
+        raise RuntimeError(f"The {name} phase failed with exit code {process.exitcode}")
+    return result
+
+def get_commit():
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark repo_prompt_generator on a synthetic repository.")
+    parser.add_argument("--tree", help="Benchmark this existing directory instead of generating one")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per phase (default: 3)")
+    parser.add_argument("--phase", action="append", choices=list(PHASES), help="Only run this phase; may be repeated")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    add_tree_arguments(parser)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="rpg-bench-")
+    try:
+        if args.tree:
+            tree = os.path.abspath(args.tree)
+            tree_info = {"path": tree}
+        else:
+            tree = os.path.join(work_dir, "tree")
+            tree_info = generate_tree(tree, **tree_params(args))
+        output_dir = os.path.join(work_dir, "output")
+        phases = {}
+        for name in args.phase or PHASES:
+            phases[name] = run_phase(rpg, name, tree, output_dir, args.repeat)
+            print(f"{name}: {round(phases[name]['median'], 4)}s median, {phases[name]['peak_rss_kb']} KB peak RSS", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "tree": tree_info,
+        "phases": phases,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Generate a deterministic synthetic repository for benchmarks.
+
+python benchmarks/synthetic_tree.py /tmp/synthetic --files 5000 --depth 5
+"""
+import os
+import sys
+import math
+import random
+import argparse
+
+DEFAULTS = {
+    "files": 2000,            # Source and binary files outside node_modules
+    "depth": 4,               # Directory levels below the root
+    "fanout": 4,              # Subdirectories per directory
+    "median_kb": 4.0,         # Median file size; sizes follow a log-normal distribution
+    "size_sigma": 1.0,        # Spread of the log-normal size distribution
+    "max_kb": 2048.0,         # Largest file generated
+    "binary_fraction": 0.05,  # Share of files that are binary
+    "ignored_fraction": 0.05, # Share of files matched by the .gitignore (build output, logs)
+    "node_modules_files": 2000,
+    "gitignore_patterns": 50,
+    "seed": 0,
+}
+
+TEXT_EXTENSIONS = [(".py", 30), (".js", 20), (".ts", 10), (".md", 10), (".json", 10), (".c", 8), (".h", 5), (".txt", 7)]
+BINARY_EXTENSIONS = [".png", ".bin", ".so"]
+WORDS = "index chunk token manifest reader writer buffer offset pattern ignore scan node file size limit cache".split()
+
+def _weighted_choice(rng, choices):
+    total = sum(weight for _, weight in choices)
+    pick = rng.uniform(0, total)
+    for value, weight in choices:
+        pick -= weight
+        if pick <= 0:
+            return value
+    return choices[-1][0]
+
+def _file_size(rng, params):
+    size_kb = rng.lognormvariate(math.log(params["median_kb"]), params["size_sigma"])
+    return max(1, int(min(size_kb, params["max_kb"]) * 1024))
+
+def _text_content(rng, extension, size):
+    lines = []
+    length = 0
+    number = 0
+    while length < size:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 8)))
+        if extension == ".py":
+            line = f"def {rng.choice(WORDS)}_{number}(value):  # {words}\n    return value + {number}\n"
+        elif extension in (".js", ".ts", ".c", ".h"):
+            line = f"/* {words} */\nint {rng.choice(WORDS)}_{number} = {number};\n"
+        elif extension == ".json":
+            line = f'{{"{rng.choice(WORDS)}_{number}": "{words}"}}\n'
+        else:
+            line = f"{words.capitalize()} {number}.\n"
+        lines.append(line)
+        length += len(line)
+        number += 1
+    return "".join(lines)[:size].encode("ascii")
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+def _gitignore_lines(rng, count):
+    # The first rules match the generated build output and logs; the rest are
+    # realistic rules that match nothing, so matching cost scales with `count`
+    rules = ["build/", "*.log", "!keep.log"]
+    templates = ["*.{word}{n}", "/{word}_{n}/", "{word}_{n}/**/cache", "**/{word}{n}.tmp", "dist_{n}/", "!{word}_{n}.keep"]
+    for n in range(max(0, count - len(rules))):
+        rules.append(rng.choice(templates).format(word=rng.choice(WORDS), n=n))
+    return ["# Generated by synthetic_tree.py"] + rules[:count]
+
+def generate_tree(root, **params):
+    """Write a synthetic repository under `root` and return a summary; see DEFAULTS for the parameters."""
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise TypeError(f"Unknown tree parameters: {', '.join(sorted(unknown))}")
+    params = dict(DEFAULTS, **params)
+    rng = random.Random(params["seed"])
+
+    directories = [""]
+    level = [""]
+    for depth in range(params["depth"]):
+        level = [os.path.join(parent, f"{rng.choice(WORDS)}_{depth}_{i}") for parent in level for i in range(params["fanout"])]
+        directories.extend(level)
+
+    summary = {"files": 0, "bytes": 0, "binary_files": 0, "ignored_files": 0, "node_modules_files": 0, "directories": len(directories)}
+    for n in range(params["files"]):
+        directory = rng.choice(directories)
+        size = _file_size(rng, params)
+        if rng.random() < params["binary_fraction"]:
+            extension = rng.choice(BINARY_EXTENSIONS)
+            data = bytes([0]) + rng.randbytes(size - 1)
+            summary["binary_files"] += 1
+        else:
+            extension = _weighted_choice(rng, TEXT_EXTENSIONS)
+            data = _text_content(rng, extension, size)
+        name = f"{rng.choice(WORDS)}_{n}{extension}"
+        if rng.random() < params["ignored_fraction"]:
+            if rng.random() < 0.5:
+                directory = os.path.join(directory, "build")
+            else:
+                name = f"{rng.choice(WORDS)}_{n}.log"
+            summary["ignored_files"] += 1
+        _write(os.path.join(root, directory, name), data)
+        summary["files"] += 1
+        summary["bytes"] += len(data)
+
+    packages = max(1, params["node_modules_files"] // 10)
+    for n in range(params["node_modules_files"]):
+        package = f"{rng.choice(WORDS)}-{n % packages}"
+        data = _text_content(rng, ".js", _file_size(rng, params))
+        _write(os.path.join(root, "node_modules", package, "lib", f"{rng.choice(WORDS)}_{n}.js"), data)
+        summary["node_modules_files"] += 1
+        summary["bytes"] += len(data)
+
+    _write(os.path.join(root, ".gitignore"), ("\n".join(_gitignore_lines(rng, params["gitignore_patterns"])) + "\n").encode("ascii"))
+    summary["params"] = params
+    return summary
+
+def add_tree_arguments(parser):
+    for name, default in DEFAULTS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=type(default), default=default)
+
+def tree_params(args):
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic repository for benchmarks.")
+    parser.add_argument("root", help="Directory to write the tree into; must not exist yet")
+    add_tree_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.root):
+        print(f"The directory already exists: {args.root}")
+        sys.exit(1)
+    summary = generate_tree(args.root, **tree_params(args))
+    print(f"Wrote {summary['files']} files and {summary['node_modules_files']} node_modules files "
+          f"({round(summary['bytes'] / 1024 / 1024, 2)} MB) to {args.root}")
@@ -1,6 +1,7 @@
-import requests
 from datetime import datetime, timedelta
 import os
+from github_api import GitHubAPIError, create_session, fetch_all_pages
+from github_store import GitHubStore, sync_search
 
 # GitHub personal access token
 access_token = os.environ.get("GITHUB_ACCESS_TOKEN")
@@ -11,14 +12,11 @@ organizations = ["TBD54566975"]
 # Number of days for closed pull requests
 days_closed = 30
 
-# GitHub API endpoint for searching issues and pull requests
-search_url = "https://api.github.com/search/issues"
+# Local store of pull requests, comments and cached responses, kept between runs
+store = GitHubStore()
 
-# Headers for authentication
-headers = {
-    "Authorization": f"Bearer {access_token}",
-    "Accept": "application/vnd.github.v3+json",
-}
+# One pooled, authenticated session shared by every request, making conditional requests against the store
+session = create_session(access_token, cache=store)
 
 # List to store all pull requests
 all_prs = []
@@ -30,45 +28,42 @@ for org in organizations:
     # Calculate the date threshold for closed pull requests (2 weeks ago)
     closed_date_threshold = (datetime.now() - timedelta(days=days_closed)).strftime("%Y-%m-%d")
 
-    # Search query parameters for open pull requests
-    open_params = {
-        "q": f"is:pr is:open org:{org}",
-        "sort": "comments",
-        "order": "desc",
-        "per_page": 100,
-    }
-
-    # Search query parameters for closed pull requests
-    closed_params = {
-        "q": f"is:pr is:closed org:{org} closed:>={closed_date_threshold}",
-        "sort": "comments",
-        "order": "desc",
-        "per_page": 100,
-    }
-
-    # Send GET requests to the GitHub API for open and closed pull requests
-    open_response = requests.get(search_url, headers=headers, params=open_params)
-    closed_response = requests.get(search_url, headers=headers, params=closed_params)
-
-    # Check if the requests were successful
-    if open_response.status_code == 200 and closed_response.status_code == 200:
-        # Parse the JSON responses
-        open_data = open_response.json()
-        closed_data = closed_response.json()
-
-        # Filter out pull requests made by GitHub Actions and Dependabot
-        filtered_open_prs = [pr for pr in open_data["items"] if not pr["user"]["login"].endswith("[bot]")]
-        filtered_closed_prs = [pr for pr in closed_data["items"] if not pr["user"]["login"].endswith("[bot]")]
-
-        # Add the filtered pull requests to the list of all pull requests
-        all_prs.extend(filtered_open_prs)
-        all_prs.extend(filtered_closed_prs)
-    else:
-        print(f"Error: Open - {open_response.status_code}, Closed - {closed_response.status_code}")
+    # The first run fetches the open and recently closed pull requests; later
+    # runs only fetch pull requests updated since the previous one
+    try:
+        fetched = sync_search(
+            session, store, org, "pr-prompt-generator",
+            [f"is:pr is:open org:{org}", f"is:pr is:closed org:{org} closed:>={closed_date_threshold}"],
+            f"is:pr org:{org}",
+        )
+        print(f"Fetched {fetched} new or updated pull requests")
+    except GitHubAPIError as e:
+        print(f"Error: {e.status_code} - {e.text}")
+
+    # Filter out pull requests made by GitHub Actions and Dependabot
+    open_prs = store.get_items(org, "pr", state="open")
+    closed_prs = store.get_items(org, "pr", state="closed", closed_since=closed_date_threshold)
+    filtered_open_prs = [pr for pr in open_prs if not pr["user"]["login"].endswith("[bot]")]
+    filtered_closed_prs = [pr for pr in closed_prs if not pr["user"]["login"].endswith("[bot]")]
+
+    # Add the filtered pull requests to the list of all pull requests
+    all_prs.extend(filtered_open_prs)
+    all_prs.extend(filtered_closed_prs)
 
 # Sort the pull requests based on the number of comments
 sorted_prs = sorted(all_prs, key=lambda pr: pr["comments"], reverse=True)
 
+# Comments are only fetched for pull requests updated since their comments were stored
+comments_by_pr = [store.get_comments(pr) for pr in sorted_prs]
+stale_prs = [pr for pr, comments in zip(sorted_prs, comments_by_pr) if comments is None]
+comment_results = fetch_all_pages(session, [(pr["comments_url"], {"per_page": 100}) for pr in stale_prs])
+comment_errors = {}
+for pr, (comments_data, comments_error) in zip(stale_prs, comment_results):
+    if comments_error:
+        comment_errors[pr["id"]] = comments_error
+    else:
+        store.save_comments(pr, comments_data)
+
 # Output pull request information and comments to a plain text file
 with open("prs.txt", "w") as file:
     for pr in sorted_prs:
@@ -79,12 +74,9 @@ with open("prs.txt", "w") as file:
         file.write(f"Comments: {pr['comments']}\n")
         file.write("\n")
 
-        # Get the list of comments for each pull request
-        comments_url = pr["comments_url"]
-        comments_response = requests.get(comments_url, headers=headers)
-        if comments_response.status_code == 200:
-            comments_data = comments_response.json()
-            for comment in comments_data:
+        # Write the stored comments of this pull request
+        if pr["id"] not in comment_errors:
+            for comment in store.get_comments(pr):
                 if not comment["user"]["login"].endswith("[bot]"):
                     file.write("===========================================\n")
                     file.write(f"Comment by {comment['user']['login']}:\n")
@@ -92,8 +84,9 @@ with open("prs.txt", "w") as file:
                     file.write(f"{comment['body']}\n")
                     file.write("\n")
         else:
-            print(f"Error retrieving comments: {comments_response.status_code} - {comments_response.text}")
+            print(f"Error retrieving comments: {comment_errors[pr['id']].status_code} - {comment_errors[pr['id']].text}")
 
         file.write("---\n")
 
+store.close()
 print("Pull request information and comments saved to prs.txt")
\ No newline at end of file
@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import threading
+import requests
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+# Base URL of the GitHub API; point it at GitHub Enterprise or a local mock server to test against
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# Requests in flight at once, and connections kept open for reuse
+MAX_WORKERS = int(os.environ.get("GITHUB_MAX_WORKERS", "8"))
+
+class GitHubAPIError(RuntimeError):
+    """A request that did not return 200, with the status code and body of the response."""
+
+    def __init__(self, response):
+        super().__init__(f"{response.status_code} - {response.text}")
+        self.status_code = response.status_code
+        self.text = response.text
+
+def api_url(path):
+    """Return `path` ("/search/issues") under API_URL; absolute URLs from responses are kept as they are."""
+    return path if path.startswith(("http://", "https://")) else API_URL + path
+
+def get_bucket(url):
+    """Guess the rate limit bucket of a request from its URL, before X-RateLimit-Resource names it."""
+    path = urlparse(url).path
+    if "/search/code" in path:
+        return "code_search"
+    if "/search/" in path:
+        return "search"
+    if path.endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+class RateLimiter:
+    """Tracks the X-RateLimit-* quota of each API bucket and holds requests back until it resets."""
+
+    def __init__(self, max_retries=5):
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.buckets = {}  # Bucket -> [remaining, reset as epoch seconds]
+
+    def wait(self, bucket):
+        while True:
+            with self.lock:
+                quota = self.buckets.get(bucket)
+                if not quota or quota[0] > 0:
+                    if quota:
+                        quota[0] -= 1
+                    return
+                delay = quota[1] - time.time() + 1
+                if delay <= 0:
+                    # The window has reset; the next response reports the new quota
+                    del self.buckets[bucket]
+                    return
+            print(f"Rate limit for the {bucket} API reached; waiting {round(delay)}s for it to reset", file=sys.stderr)
+            time.sleep(delay)
+
+    def update(self, bucket, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        bucket = response.headers.get("X-RateLimit-Resource", bucket)
+        remaining, reset = int(remaining), int(reset)
+        with self.lock:
+            quota = self.buckets.get(bucket)
+            # Concurrent responses arrive out of order; within a window the lowest count is the latest
+            if quota and quota[1] == reset:
+                remaining = min(remaining, quota[0])
+            self.buckets[bucket] = [remaining, reset]
+
+    def retry_delay(self, response, attempt):
+        """Seconds to wait before retrying a rate limited `response`, or None if it should not be retried."""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            return int(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            return max(0, int(response.headers.get("X-RateLimit-Reset", 0)) - time.time()) + 1
+        if "rate limit" in response.text.lower():
+            # Secondary rate limits without a Retry-After call for at least a minute, backing off exponentially
+            return 60 * 2 ** attempt
+        return None
+
+def create_session(access_token, pool_size=MAX_WORKERS, cache=None):
+    """Return an authenticated session with a connection pool, a RateLimiter and an optional response cache."""
+    session = requests.Session()
+    session.rate_limiter = RateLimiter()
+    session.cache = cache
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/vnd.github.v3+json",
+    })
+    return session
+
+def _cached_response(url, cached):
+    # Rebuild the 200 response a 304 stands for from the cached body and Link header
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = cached["body"]
+    if cached["link"]:
+        response.headers["Link"] = cached["link"]
+    return response
+
+def get_response(session, url, params=None):
+    """GET `url` within its rate limit, retrying rate limited responses and answering 304s from the cache."""
+    limiter = session.rate_limiter
+    bucket = get_bucket(url)
+    headers = {}
+    cached = None
+    # Search results change with every query and are kept in the store as items instead
+    if session.cache and bucket == "core":
+        url = requests.Request("GET", url, params=params).prepare().url
+        params = None
+        cached = session.cache.get_response(url)
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        elif cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    for attempt in range(limiter.max_retries + 1):
+        limiter.wait(bucket)
+        response = session.get(url, params=params, headers=headers)
+        limiter.update(bucket, response)
+        delay = limiter.retry_delay(response, attempt)
+        if delay is None or attempt == limiter.max_retries:
+            break
+        print(f"Rate limited by the {bucket} API; retrying in {round(delay)}s", file=sys.stderr)
+        time.sleep(delay)
+    if response.status_code == 304 and cached:
+        return _cached_response(url, cached)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if session.cache and bucket == "core" and response.status_code == 200 and (etag or last_modified):
+        session.cache.put_response(url, etag, last_modified, response.content, response.headers.get("Link"))
+    return response
+
+def get_json(session, path, params=None):
+    """Fetch a single page of `path` and return its JSON. Raises GitHubAPIError unless it returns 200."""
+    response = get_response(session, api_url(path), params)
+    if response.status_code != 200:
+        raise GitHubAPIError(response)
+    return response.json()
+
+def get_all_pages(session, path, params=None):
+    """Fetch `path` and every following page, and return all items in order; raises GitHubAPIError."""
+    items = []
+    total_count = None
+    url = api_url(path)
+    while url:
+        response = get_response(session, url, params)
+        if response.status_code != 200:
+            raise GitHubAPIError(response)
+        data = response.json()
+        if isinstance(data, dict) and "items" in data:
+            total_count = data.get("total_count")
+            data = data["items"]
+        items.extend(data)
+        # The next page URL already carries the query parameters
+        url = response.links.get("next", {}).get("url")
+        params = None
+    if total_count is not None and total_count > len(items):
+        # The Search API stops after 1000 results
+        print(f"Warning: {path} matched {total_count} results, but only {len(items)} could be fetched", file=sys.stderr)
+    return items
+
+def fetch_all_pages(session, queries, max_workers=MAX_WORKERS):
+    """Fetch every page of each (path, params) query concurrently; returns (items, error) pairs in order."""
+    def fetch(query):
+        path, params = query
+        try:
+            return get_all_pages(session, path, params), None
+        except GitHubAPIError as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fetch, queries))
@@ -0,0 +1,139 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from github_api import fetch_all_pages
+
+# SQLite file shared by the GitHub scripts; delete it to force a full sync
+STORE_PATH = os.environ.get("GITHUB_STORE", "github_store.sqlite3")
+
+# Sync cursors are moved back by this much to cover clock skew and search indexing delay
+CURSOR_OVERLAP = timedelta(minutes=5)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    link TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    org TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    comments INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    closed_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_org ON items (org, kind, state, closed_at);
+CREATE TABLE IF NOT EXISTS comments (
+    item_id INTEGER PRIMARY KEY,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    org TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    updated_since TEXT NOT NULL,
+    PRIMARY KEY (org, scope)
+);
+"""
+
+def format_timestamp(moment):
+    """Format an aware datetime the way GitHub does, so timestamps compare as strings."""
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class GitHubStore:
+    """SQLite store of cached responses, search items, comments and sync cursors, shared between runs."""
+
+    def __init__(self, path=STORE_PATH):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def get_response(self, url):
+        with self.lock:
+            return self.connection.execute("SELECT * FROM responses WHERE url = ?", (url,)).fetchone()
+
+    def put_response(self, url, etag, last_modified, body, link):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body, link) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, link),
+            )
+
+    def save_items(self, items):
+        """Insert or update search result items, filed under the org and repository of their repository_url."""
+        rows = []
+        for item in items:
+            org, repo = item["repository_url"].rstrip("/").split("/")[-2:]
+            kind = "pr" if "pull_request" in item else "issue"
+            rows.append((item["id"], org, repo, kind, item["number"], item["state"], item["comments"],
+                         item["updated_at"], item["closed_at"], json.dumps(item)))
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def get_items(self, org, kind, state=None, closed_since=None):
+        """Return stored items of `org`, most commented first; `closed_since` is a GitHub timestamp or date."""
+        query = "SELECT data FROM items WHERE org = ? COLLATE NOCASE AND kind = ?"
+        params = [org, kind]
+        if state:
+            query += " AND state = ?"
+            params.append(state)
+        if closed_since:
+            query += " AND closed_at >= ?"
+            params.append(closed_since)
+        query += " ORDER BY comments DESC, number DESC"
+        with self.lock:
+            return [json.loads(row["data"]) for row in self.connection.execute(query, params)]
+
+    def get_comments(self, item):
+        """Return the stored comments of `item`, or None if it has been updated since they were fetched."""
+        with self.lock:
+            row = self.connection.execute("SELECT * FROM comments WHERE item_id = ?", (item["id"],)).fetchone()
+        if row and row["updated_at"] == item["updated_at"]:
+            return json.loads(row["data"])
+        return None
+
+    def save_comments(self, item, comments):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO comments (item_id, updated_at, data) VALUES (?, ?, ?)",
+                (item["id"], item["updated_at"], json.dumps(comments)),
+            )
+
+    def get_cursor(self, org, scope):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT updated_since FROM cursors WHERE org = ? AND scope = ?", (org, scope)
+            ).fetchone()
+        return row["updated_since"] if row else None
+
+    def set_cursor(self, org, scope, updated_since):
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)", (org, scope, updated_since))
+
+def sync_search(session, store, org, scope, full_queries, changed_query):
+    """Store `org`'s items updated since the scope's cursor (`full_queries` on the first sync); returns how many."""
+    started = datetime.now(timezone.utc)
+    cursor = store.get_cursor(org, scope)
+    queries = [f"{changed_query} updated:>={cursor}"] if cursor else full_queries
+    results = fetch_all_pages(session, [("/search/issues", {"q": query, "per_page": 100}) for query in queries])
+    fetched = 0
+    for items, error in results:
+        if error:
+            raise error
+        store.save_items(items)
+        fetched += len(items)
+    store.set_cursor(org, scope, format_timestamp(started - CURSOR_OVERLAP))
+    return fetched
@@ -1,6 +1,7 @@
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
+from github_api import GitHubAPIError, create_session, get_all_pages, get_json
+from github_store import GitHubStore, format_timestamp, sync_search
 
 # GitHub personal access token
 access_token = os.environ.get("GITHUB_READ_TOKEN")
@@ -12,35 +13,44 @@ organizations = ["TBD54566975", "tbdeng"]
 output_file = "github_summary_past_week.txt"
 
 # GitHub API endpoints
-repos_url = "https://api.github.com/orgs/{org}/repos"
-search_url = "https://api.github.com/search/issues"
+repos_path = "/orgs/{org}/repos"
+search_path = "/search/issues"
 
-# Headers for authentication
-headers = {
-    "Authorization": f"Bearer {access_token}",
-    "Accept": "application/vnd.github.v3+json",
-}
+# Local store of issues, pull requests and cached responses, kept between runs
+store = GitHubStore()
+
+# One pooled, authenticated session; its rate limiter waits out spent quotas instead of
+# failing, and repeated requests are made conditional on the responses in the store
+session = create_session(access_token, cache=store)
+
+# Repositories of each organization, fetched once and reused for the summary
+org_repos = {}
 
 def check_token_permissions():
     for org in organizations:
         # Test fetching repositories
-        repo_response = requests.get(repos_url.format(org=org), headers=headers)
-        if repo_response.status_code == 403:
-            print(f"Error: Your token does not have permission to fetch repositories for organization '{org}'.")
-            return False
+        try:
+            org_repos[org] = get_all_pages(session, repos_path.format(org=org), {"per_page": 100})
+        except GitHubAPIError as e:
+            if e.status_code == 403:
+                print(f"Error: Your token does not have permission to fetch repositories for organization '{org}'.")
+                return False
+            # Reported again when the summary is written
+            org_repos[org] = e
+            continue
 
         # Test searching for issues
-        repos = repo_response.json()
-        if repos:
-            test_repo = repos[0]['name']
+        if org_repos[org]:
             search_params = {
-                "q": f"repo:{org}/{test_repo} is:issue is:closed",
+                "q": f"org:{org} is:issue is:closed",
                 "per_page": 1,
             }
-            search_response = requests.get(search_url, headers=headers, params=search_params)
-            if search_response.status_code == 403:
-                print(f"Error: Your token does not have permission to search for issues in organization '{org}'.")
-                return False
+            try:
+                get_json(session, search_path, search_params)
+            except GitHubAPIError as e:
+                if e.status_code == 403:
+                    print(f"Error: Your token does not have permission to search for issues in organization '{org}'.")
+                    return False
         else:
             print(f"Warning: No repositories found for organization '{org}'. Skipping issue search test.")
 
@@ -50,46 +60,58 @@ if not check_token_permissions():
     print("Token does not have the necessary permissions. Exiting.")
     exit(1)
 
-# Calculate the date threshold (7 days ago)
-date_threshold = (datetime.now() - timedelta(days=7)).isoformat()
+# Calculate the date threshold (7 days ago), as a UTC timestamp comparable with GitHub's
+date_threshold = format_timestamp(datetime.now(timezone.utc) - timedelta(days=7))
+
+def get_closed_items(organization, item_type):
+    # Stored items closed in the past week, split by repository
+    items_by_repo = {}
+    for item in store.get_items(organization, item_type, state="closed", closed_since=date_threshold):
+        items_by_repo.setdefault(item["repository_url"].rsplit("/", 1)[-1], []).append(item)
+    return items_by_repo
 
 def fetch_and_write_summary(organization):
     with open(output_file, "a") as file:
         file.write(f"Organization: {organization}\n")
         file.write("Summary of Closed PRs and Issues for the Past Week:\n\n")
-        
-        # Fetch repositories for the organization
-        response = requests.get(repos_url.format(org=organization), headers=headers)
-        if response.status_code == 200:
-            repos = response.json()
-            for repo in repos:
-                repo_name = repo['name']
-                # Write repository header
-                file.write(f"Repository: {repo_name}\n")
-
-                # Fetch and write PRs and issues for the repository
-                for item_type in ["pr", "issue"]:
-                    search_params = {
-                        "q": f"repo:{organization}/{repo_name} is:{item_type} is:closed closed:>={date_threshold}",
-                        "per_page": 100,
-                    }
-                    items_response = requests.get(search_url, headers=headers, params=search_params)
-                    if items_response.status_code == 200:
-                        items = items_response.json()["items"]
-                        if items:
-                            file.write(f"  {item_type.capitalize()}s:\n")
-                            for item in items:
-                                body_summary = item['body'][:500] if item['body'] else "No description provided."
-                                file.write(f"  - {item['title']}: {body_summary}...\n")
-                        else:
-                            file.write(f"  No closed {item_type}s in the past week.\n")
-                    elif items_response.status_code == 403:
-                        file.write(f"  No recent activity found for {item_type}s in repository {repo_name}.\n")
-                    else:
-                        file.write(f"Error fetching {item_type}s for repository {repo_name}: {items_response.status_code}\n")
-                file.write("\n")  # Add space after each repo
-        else:
-            file.write(f"Error fetching repositories for organization {organization}: {response.status_code}\n")
+
+        repos = org_repos[organization]
+        if isinstance(repos, GitHubAPIError):
+            file.write(f"Error fetching repositories for organization {organization}: {repos.status_code}\n")
+            return
+
+        # The first run searches the org for each item type closed in the past week; later
+        # runs make one search for the items updated since the previous run. A sync error
+        # is written under every repository it affects.
+        try:
+            sync_search(
+                session, store, organization, "last-week",
+                [f"org:{organization} is:{item_type} is:closed closed:>={date_threshold}" for item_type in ["pr", "issue"]],
+                f"org:{organization}",
+            )
+            closed_items = {item_type: get_closed_items(organization, item_type) for item_type in ["pr", "issue"]}
+        except GitHubAPIError as e:
+            closed_items = {"pr": e, "issue": e}
+
+        for repo in repos:
+            repo_name = repo['name']
+            # Write repository header
+            file.write(f"Repository: {repo_name}\n")
+
+            # Write PRs and issues for the repository
+            for item_type in ["pr", "issue"]:
+                if isinstance(closed_items[item_type], GitHubAPIError):
+                    file.write(f"Error fetching {item_type}s for repository {repo_name}: {closed_items[item_type].status_code}\n")
+                    continue
+                items = closed_items[item_type].get(repo_name)
+                if items:
+                    file.write(f"  {item_type.capitalize()}s:\n")
+                    for item in items:
+                        body_summary = item['body'][:500] if item['body'] else "No description provided."
+                        file.write(f"  - {item['title']}: {body_summary}...\n")
+                else:
+                    file.write(f"  No closed {item_type}s in the past week.\n")
+            file.write("\n")  # Add space after each repo
 
 # Clear the file before writing
 open(output_file, "w").close()
@@ -98,4 +120,5 @@ open(output_file, "w").close()
 for org in organizations:
     fetch_and_write_summary(org)
 
-print(f"Summary of closed PRs and issues from the past week has been written to {output_file}.")
\ No newline at end of file
+store.close()
+print(f"Summary of closed PRs and issues from the past week has been written to {output_file}.")
@@ -0,0 +1,1383 @@
+import os
+import sys
+import stat
+import heapq
+import re
+import json
+import hashlib
+import mmap
+import math
+import importlib
+import codecs
+import io
+import tokenize
+import time
+import contextlib
+import argparse
+import subprocess
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+def read_ignore_file(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r", errors="replace") as file:
+        return file.read().splitlines()
+
+def get_excluded_patterns(excluded_paths):
+    # Always ignore node_modules
+    excluded_patterns = ['node_modules']
+    excluded_patterns.extend('/' + path.strip('/') for path in excluded_paths)
+    return excluded_patterns
+
+def get_ignored_patterns(project_dir):
+    ignored_patterns = read_ignore_file(os.path.join(project_dir, ".git", "info", "exclude"))
+    ignored_patterns.extend(read_ignore_file(os.path.join(project_dir, ".gitignore")))
+    return ignored_patterns
+
+def list_git_files(project_dir, since=None):
+    """List files from the git index (or changed against `since`), relative to `project_dir` and '/'-separated."""
+    if since:
+        command = ["git", "diff", "--name-only", "--relative", "--diff-filter=ACMRT", "-z", since, "--"]
+    else:
+        command = ["git", "ls-files", "-z", "--cached"]
+    try:
+        result = subprocess.run(command, cwd=project_dir, capture_output=True)
+    except OSError as e:
+        raise RuntimeError(f"Unable to run git: {e}")
+    if result.returncode != 0:
+        raise RuntimeError(f"git failed in {project_dir}: {result.stderr.decode(errors='replace').strip()}")
+    return [os.fsdecode(path) for path in result.stdout.split(b"\0") if path]
+
+def translate_ignore_pattern(pattern):
+    """Translate one gitignore line into (regex, negate, dir_only), or None for blanks and comments."""
+    if pattern.startswith('#'):
+        return None
+    pattern = re.sub(r'(?<!\\) +$', '', pattern)  # Trailing spaces are dropped unless escaped
+    negate = pattern.startswith('!')
+    if negate:
+        pattern = pattern[1:]
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    if not pattern:
+        return None
+    # A slash at the start or in the middle anchors the pattern to the ignore file's directory
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    regex = []
+    i, n = 0, len(pattern)
+    while i < n:
+        at_segment_start = i == 0 or pattern[i - 1] == '/'
+        c = pattern[i]
+        if at_segment_start and pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif at_segment_start and pattern.startswith('**', i) and i + 2 == n:
+            regex.append('.*')
+            i += 2
+        elif c == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif c == '?':
+            regex.append('[^/]')
+            i += 1
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                regex.append('\\[')
+                i += 1
+            else:
+                body = pattern[i + 1:j].replace('\\', '\\\\')
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                regex.append(f'[{body}]')
+                i = j + 1
+        elif c == '\\' and i + 1 < n:
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(c))
+            i += 1
+
+    regex = ''.join(regex)
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return regex, negate, dir_only
+
+def compile_ignore_patterns(patterns):
+    """Compile gitignore lines into blocks of (negate, regex, dir_only_regex), one combined regex per run of rules."""
+    rules = [rule for rule in map(translate_ignore_pattern, patterns) if rule]
+    blocks = []
+    start = 0
+    for i in range(1, len(rules) + 1):
+        if i == len(rules) or rules[i][1] != rules[start][1]:
+            block = rules[start:i]
+            any_regex = [regex for regex, _, dir_only in block if not dir_only]
+            dir_regex = [regex for regex, _, dir_only in block if dir_only]
+            blocks.append((
+                block[0][1],
+                re.compile('(?s:' + '|'.join(any_regex) + r')\Z') if any_regex else None,
+                re.compile('(?s:' + '|'.join(dir_regex) + r')\Z') if dir_regex else None,
+            ))
+            start = i
+    return blocks
+
+class IgnoreMatcher:
+    """Compiled gitignore rules, layered per directory; the last matching rule of the deepest layer wins."""
+
+    def __init__(self, layers=(), excluded=()):
+        self.layers = layers
+        # node_modules and the user's exclusions; checked first, so no ignore file can negate them
+        self.excluded = excluded
+
+    def add_layer(self, base, patterns):
+        blocks = compile_ignore_patterns(patterns)
+        if not blocks:
+            return self
+        return IgnoreMatcher(self.layers + ((base, blocks),), self.excluded)
+
+    def is_ignored(self, relative_path, is_dir=False):
+        for _, any_regex, dir_regex in self.excluded:
+            if (any_regex and any_regex.match(relative_path)) or (is_dir and dir_regex and dir_regex.match(relative_path)):
+                return True
+        for base, blocks in reversed(self.layers):
+            if base:
+                if not relative_path.startswith(base + '/'):
+                    continue
+                path = relative_path[len(base) + 1:]
+            else:
+                path = relative_path
+            for negate, any_regex, dir_regex in reversed(blocks):
+                if (any_regex and any_regex.match(path)) or (is_dir and dir_regex and dir_regex.match(path)):
+                    return not negate
+        return False
+
+def get_ignore_matcher(project_dir, excluded_paths, use_ignore_files=True):
+    ignore_matcher = IgnoreMatcher(excluded=compile_ignore_patterns(get_excluded_patterns(excluded_paths)))
+    if use_ignore_files:
+        ignore_matcher = ignore_matcher.add_layer('', get_ignored_patterns(project_dir))
+    return ignore_matcher
+
+def should_ignore(path, ignore_matcher, project_dir, is_dir=False):
+    relative_path = os.path.relpath(path, project_dir)
+    if os.sep != '/':
+        relative_path = relative_path.replace(os.sep, '/')
+    return ignore_matcher.is_ignored(relative_path, is_dir)
+
+# A file recorded in the scan index, with its stat result cached
+FileEntry = namedtuple("FileEntry", ["name", "path", "extension", "size", "mtime_ns"])
+
+class DirNode:
+    """A directory in the scan index, with its files, subdirectories and rolled-up subtree totals."""
+
+    def __init__(self, path, project_dir, relative_path, level):
+        self.path = path
+        self.project_dir = project_dir
+        self.relative_path = relative_path
+        self.name = os.path.basename(path)
+        self.level = level
+        self.files = []
+        self.subdirs = []
+        self.excluded = False
+        self.file_count = 0
+        self.total_size = 0
+        self.ext_counts = {}
+        self.ext_sizes = {}
+        self.largest = []
+
+class ScanIndex:
+    """Every project directory scanned once, so sizes, counts and prompts are answered without touching the disk again."""
+
+    def __init__(self, num_largest=5):
+        self.num_largest = num_largest
+        self.roots = []
+        self.nodes = {}
+        self.skipped = {}  # File path -> reason it is listed in the tree but not packed
+
+    def add_project(self, project_dir, ignore_matcher):
+        root = DirNode(project_dir, project_dir, '', 0)
+        stack = [(root, ignore_matcher)]
+        while stack:
+            node, matcher = stack.pop()
+            matcher = self._scan_dir(node, matcher)
+            stack.extend((subdir, matcher) for subdir in reversed(node.subdirs))
+        return self._add_root(root)
+
+    def add_git_project(self, project_dir, relative_paths, ignore_matcher):
+        """Build the tree for `project_dir` from a list of git-tracked paths instead of walking it."""
+        root = DirNode(project_dir, project_dir, '', 0)
+        dir_nodes = {'': root}  # Relative path -> node, or None for ignored directories
+        for relative_path in relative_paths:
+            parent_path, _, name = relative_path.rpartition('/')
+            parent = self._get_git_dir_node(dir_nodes, parent_path, ignore_matcher)
+            if parent is None or ignore_matcher.is_ignored(relative_path):
+                continue
+            file_path = os.path.join(parent.path, name)
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                continue  # Deleted in the working tree
+            if not stat.S_ISREG(file_stat.st_mode):
+                continue  # Submodules and symlinks to directories
+            _, extension = os.path.splitext(name)
+            parent.files.append(FileEntry(name, file_path, extension, file_stat.st_size, file_stat.st_mtime_ns))
+        return self._add_root(root)
+
+    def _get_git_dir_node(self, dir_nodes, relative_path, ignore_matcher):
+        if relative_path in dir_nodes:
+            return dir_nodes[relative_path]
+        parent_path, _, name = relative_path.rpartition('/')
+        parent = self._get_git_dir_node(dir_nodes, parent_path, ignore_matcher)
+        node = None
+        if parent is not None and not ignore_matcher.is_ignored(relative_path, is_dir=True):
+            node = DirNode(os.path.join(parent.path, name), parent.project_dir, relative_path, parent.level + 1)
+            parent.subdirs.append(node)
+        dir_nodes[relative_path] = node
+        return node
+
+    def _add_root(self, root):
+        order = [root]
+        for node in order:
+            self.nodes[node.path] = node
+            order.extend(node.subdirs)
+        # Children always come after their parent in `order`, so walking it
+        # backwards rolls the subtree totals up in a single pass
+        for node in reversed(order):
+            self._add_totals(node)
+        self.roots.append(root)
+        return root
+
+    def _scan_dir(self, node, matcher):
+        """Scan one directory into `node` and return the matcher for its subtree."""
+        try:
+            with os.scandir(node.path) as it:
+                entries = list(it)
+        except OSError:
+            return matcher
+        if node.level > 0 and any(entry.name == '.gitignore' for entry in entries):
+            matcher = matcher.add_layer(node.relative_path, read_ignore_file(os.path.join(node.path, '.gitignore')))
+        prefix = node.relative_path + '/' if node.relative_path else ''
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            relative_path = prefix + entry.name
+            if is_dir:
+                # Like os.walk, never descend into symlinked directories
+                if entry.name == '.git' or entry.is_symlink():
+                    continue
+                if not matcher.is_ignored(relative_path, is_dir=True):
+                    node.subdirs.append(DirNode(entry.path, node.project_dir, relative_path, node.level + 1))
+            elif not matcher.is_ignored(relative_path):
+                try:
+                    file_stat = entry.stat()
+                except OSError:
+                    continue
+                if not stat.S_ISREG(file_stat.st_mode):
+                    continue  # Sockets, FIFOs and devices would block or never end when read
+                _, extension = os.path.splitext(entry.name)
+                node.files.append(FileEntry(entry.name, entry.path, extension, file_stat.st_size, file_stat.st_mtime_ns))
+        return matcher
+
+    def _add_totals(self, node):
+        largest = [(file.size, file.name) for file in node.files]
+        for file in node.files:
+            node.file_count += 1
+            node.total_size += file.size
+            node.ext_counts[file.extension] = node.ext_counts.get(file.extension, 0) + 1
+            node.ext_sizes[file.extension] = node.ext_sizes.get(file.extension, 0) + file.size
+        for subdir in node.subdirs:
+            node.file_count += subdir.file_count
+            node.total_size += subdir.total_size
+            for extension, count in subdir.ext_counts.items():
+                node.ext_counts[extension] = node.ext_counts.get(extension, 0) + count
+            for extension, size in subdir.ext_sizes.items():
+                node.ext_sizes[extension] = node.ext_sizes.get(extension, 0) + size
+            largest.extend(subdir.largest)
+        node.largest = heapq.nlargest(self.num_largest, largest)
+
+    def walk(self):
+        """Yield directory nodes in os.walk (top-down) order, skipping excluded subtrees."""
+        for root in self.roots:
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                if node.excluded:
+                    continue
+                yield node
+                # Checked again after resuming, so callers can exclude the node they were given
+                if not node.excluded:
+                    stack.extend(reversed(node.subdirs))
+
+def build_scan_index(project_dirs, excluded_paths, use_git=False, since=None):
+    index = ScanIndex()
+    for project_dir in project_dirs:
+        if use_git or since:
+            # Git has already applied the ignore rules to the files it tracks
+            ignore_matcher = get_ignore_matcher(project_dir, excluded_paths, use_ignore_files=False)
+            index.add_git_project(project_dir, list_git_files(project_dir, since), ignore_matcher)
+        else:
+            index.add_project(project_dir, get_ignore_matcher(project_dir, excluded_paths))
+    return index
+
+def get_directory_size_in_bytes(node, specified_extensions):
+    if specified_extensions:
+        return sum(node.ext_sizes.get(extension, 0) for extension in specified_extensions)
+    return node.total_size
+
+def get_directory_size_in_kb(index, directory, specified_extensions):
+    total_size = get_directory_size_in_bytes(index.nodes[directory], specified_extensions)
+    return round(total_size / 1024, 2)
+
+def get_file_count(index, directory, specified_extensions):
+    node = index.nodes[directory]
+    if specified_extensions:
+        return sum(node.ext_counts.get(extension, 0) for extension in specified_extensions)
+    return node.file_count
+
+def get_largest_files(index, directory, num_files=5):
+    largest_files = index.nodes[directory].largest[:num_files]
+    return [file for _, file in largest_files]
+
+def prompt_user_for_exclusion(index, node, specified_extensions, total_size, file_count_threshold=10, size_threshold=20):
+    if node.level == 0:
+        return False, []  # Skip exclusion prompt for the root directory
+
+    file_count = get_file_count(index, node.path, specified_extensions)
+    directory_size_kb = get_directory_size_in_kb(index, node.path, specified_extensions)
+
+    if file_count > file_count_threshold or directory_size_kb > size_threshold:
+        print(f"\nDirectory: {node.path}")
+        print(f"File Count: {file_count}")
+        print(f"Total Size: {directory_size_kb} KB")
+
+        largest_files = get_largest_files(index, node.path)
+        print("Largest Files:", ", ".join(largest_files))
+
+        while True:
+            choice = input(f"Do you want to (E)xclude, (I)nclude, (G)enerate the whole file ({total_size} KB), or (O)nly include specific file extensions? (default: Include) ").lower()
+            if choice == 'e':
+                return True, []
+            elif choice == 'i' or choice == '':  # Accept empty input as 'I'
+                return False, []
+            elif choice == 'g':
+                return False, specified_extensions
+            elif choice == 'o':
+                extensions = input("Enter the file extensions to include (comma-separated): ").split(',')
+                extensions = [ext.strip() for ext in extensions]
+                return False, extensions
+            else:
+                print("Invalid choice. Please enter 'E', 'I', 'G', 'O', or press Enter for Include.")
+
+    return False, []
+
+def get_extension_sizes(index):
+    extension_sizes = {}
+    total_size = 0
+    for root in index.roots:
+        for extension, size in root.ext_sizes.items():
+            extension_sizes[extension] = extension_sizes.get(extension, 0) + size
+        total_size += root.total_size
+    for extension, size in extension_sizes.items():
+        extension_sizes[extension] = round(size / 1024, 2)  # Convert to KB
+    total_size = round(total_size / 1024, 2)  # Convert to KB
+    return extension_sizes, total_size
+
+def get_total_source_code_size(index, specified_extensions):
+    return sum(get_directory_size_in_bytes(root, specified_extensions) for root in index.roots)
+
+MANIFEST_FILE = "knowledge_manifest.json"
+INDEX_FILE = "knowledge_index.json"
+INDEX_VERSION = 2
+MANIFEST_VERSION = 4
+CHUNK_FILE = re.compile(r"knowledge_(\d+)\.txt")
+EMPTY_HASH = hashlib.sha256(b"").hexdigest()
+
+# Bytes that rule out copying a file verbatim: carriage returns need newline
+# translation and non-ASCII bytes need UTF-8 validation
+PASSTHROUGH_UNSAFE = re.compile(rb"[\r\x80-\xff]")
+
+def frame_header(file_path):
+    return f"\n{'=' * 80}\nFile: {file_path}\n{'=' * 80}\n"
+
+def frame_file_content(file_path, content):
+    return f"{frame_header(file_path)}{content}\n"
+
+UNDECODABLE_CONTENT = "Unable to decode file contents."
+
+def get_body_hash(file_path, data):
+    # Hash of the packed content inside a framed file, as the lookup index serves it
+    header_length = len(frame_header(file_path).encode("utf-8", "surrogateescape"))
+    return hashlib.sha256(memoryview(data)[header_length:-1]).hexdigest()
+
+def decode_source(data):
+    try:
+        # Decode like a text-mode open() would, including universal newlines
+        return str(data, "utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    except UnicodeDecodeError:
+        return UNDECODABLE_CONTENT
+
+def get_passthrough_chars(data):
+    """Return the character count of `data` if it can be copied into a chunk verbatim, else None."""
+    if not PASSTHROUGH_UNSAFE.search(data):
+        return len(data)
+    if data.find(b"\r") != -1:
+        return None
+    try:
+        return len(str(data, "utf-8"))
+    except UnicodeDecodeError:
+        return None
+
+def fold_whitespace(text):
+    """Strip trailing whitespace and collapse runs of blank lines; safe for any text."""
+    folded = []
+    for line in text.split("\n"):
+        line = line.rstrip()
+        if line or (folded and folded[-1]):
+            folded.append(line)
+    while folded and not folded[-1]:
+        folded.pop()
+    return "\n".join(folded)
+
+def minify_python(text):
+    """Drop comments and docstrings from Python source; a docstring that is a block's only statement becomes `...`."""
+    line_starts = [0]
+    for line in io.StringIO(text):
+        line_starts.append(line_starts[-1] + len(line))
+    tokens = list(tokenize.generate_tokens(io.StringIO(text).readline))
+    insignificant = (tokenize.COMMENT, tokenize.NL)
+    edits = []
+    statement_start = True
+    previous = None
+    for i, token in enumerate(tokens):
+        if token.type == tokenize.COMMENT:
+            edits.append((token.start, token.end, ""))
+            continue
+        if token.type == tokenize.NL:
+            continue
+        # Docstrings are string literals standing alone as the first statement of a module or block
+        first_statement = statement_start and (previous is None or previous.type == tokenize.INDENT)
+        if token.type == tokenize.STRING and first_statement and "f" not in token.string.split(token.string[-1])[0].lower():
+            after = i + 1
+            while tokens[after].type in insignificant:
+                after += 1
+            if tokens[after].type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                following = after + 1
+                while following < len(tokens) and tokens[following].type in insignificant:
+                    following += 1
+                only_statement = (previous is not None and previous.type == tokenize.INDENT
+                                  and tokens[following].type in (tokenize.DEDENT, tokenize.ENDMARKER))
+                edits.append((token.start, token.end, "..." if only_statement else ""))
+        statement_start = token.type in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT)
+        previous = token
+    # Edits are in source order, so the untouched slices between them are joined in one pass
+    pieces = []
+    position = 0
+    for start, end, replacement in edits:
+        start = line_starts[start[0] - 1] + start[1]
+        pieces.append(text[position:start])
+        pieces.append(replacement)
+        position = line_starts[end[0] - 1] + end[1]
+    pieces.append(text[position:])
+    return fold_whitespace("".join(pieces))
+
+# Strings and comments of C and Go; C++, Java, Rust and JavaScript only get whitespace
+# folding, since raw strings, text blocks, nested comments and regex literals need a parser
+C_TOKENS = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|//(?:\\\n|[^\n])*|/\*.*?\*/', re.DOTALL)
+GO_TOKENS = re.compile(r'"(?:\\.|[^"\\\n])*"|`[^`]*`|\'(?:\\.|[^\'\\\n])*\'|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+def strip_comment(match):
+    token = match.group(0)
+    if token.startswith("//"):
+        return ""
+    if token.startswith("/*"):
+        return " "  # Keep the tokens around the comment apart
+    return token
+
+def minify_c(text):
+    """Drop comments from C source, leaving string and character literals alone."""
+    return fold_whitespace(C_TOKENS.sub(strip_comment, text))
+
+def minify_go(text):
+    """Drop comments from Go source, leaving string, raw string and rune literals alone."""
+    return fold_whitespace(GO_TOKENS.sub(strip_comment, text))
+
+MINIFIERS = {".py": minify_python, ".c": minify_c, ".go": minify_go}
+
+def minify_source(file_path, content):
+    """Shrink `content` with the reducer for the file's extension, or whitespace folding for anything else."""
+    minifier = MINIFIERS.get(os.path.splitext(file_path)[1], fold_whitespace)
+    try:
+        return minifier(content)
+    except (tokenize.TokenError, SyntaxError):
+        return fold_whitespace(content)  # Not valid for its language; only the generic reducer is safe
+
+def minify_decoded(file_path, content, minify):
+    """Apply minify_source if enabled; returns (content, bytes saved)."""
+    if not minify or content is UNDECODABLE_CONTENT:
+        return content, 0
+    minified = minify_source(file_path, content)
+    return minified, len(content.encode("utf-8")) - len(minified.encode("utf-8"))
+
+def read_source_file(file_path, minify=False):
+    """Hash and frame a file; returns (content hash, framed text or None for passthrough, chars, size, bytes saved)."""
+    with open(file_path, "rb") as file:
+        file_stat = os.fstat(file.fileno())
+        if file_stat.st_size == 0 or not stat.S_ISREG(file_stat.st_mode):
+            data = file.read()
+            content_hash = hashlib.sha256(data).hexdigest()
+            content = decode_source(data)
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                content_hash = hashlib.sha256(data).hexdigest()
+                content_chars = None if minify else get_passthrough_chars(data)
+                if content_chars is not None:
+                    chars = len(frame_header(file_path)) + content_chars + 1
+                    return content_hash, None, chars, len(data), 0
+                content = decode_source(data)
+    content, saved = minify_decoded(file_path, content, minify)
+    file_content = frame_file_content(file_path, content)
+    return content_hash, file_content, len(file_content), file_stat.st_size, saved
+
+def load_manifest(output_dir, options=None):
+    """Load the previous run's manifest, or None if there is none or it was written with other options."""
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("options") != (options or {}):
+        return None
+    return manifest
+
+def _copy_file_range(in_fd, out_fd, offset, count):
+    return os.copy_file_range(in_fd, out_fd, count, offset)
+
+def _sendfile(in_fd, out_fd, offset, count):
+    return os.sendfile(out_fd, in_fd, offset, count)
+
+KERNEL_COPIES = [copy for name, copy in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile)) if hasattr(os, name)]
+
+def copy_into(source, destination, offset, length):
+    """Copy `length` bytes at `offset` of `source` to the end of `destination`; False if the source came up short."""
+    destination.flush()
+    in_fd, out_fd = source.fileno(), destination.fileno()
+    copied = 0
+    for kernel_copy in KERNEL_COPIES:
+        try:
+            while copied < length:
+                count = kernel_copy(in_fd, out_fd, offset + copied, length - copied)
+                if count == 0:
+                    break
+                copied += count
+        except OSError:
+            continue  # Not supported for these files; try the next method from where this one stopped
+        break
+    # The kernel moved the descriptor's position; resync the buffered writer with it
+    destination.seek(0, os.SEEK_END)
+    if copied < length:
+        return copy_byte_range(source, destination, offset + copied, length - copied)
+    return True
+
+def copy_byte_range(source, destination, offset, length, buffer_size=1024 * 1024):
+    """Copy `length` bytes at `offset` of the open file `source` to `destination`; returns False if it is too short."""
+    source.seek(offset)
+    while length > 0:
+        block = source.read(min(buffer_size, length))
+        if not block:
+            return False
+        destination.write(block)
+        length -= len(block)
+    return True
+
+def is_unchanged_chunk(chunk, record):
+    """Whether the chunk file (a path or descriptor) still has the size and mtime its manifest record gives."""
+    try:
+        chunk_stat = os.stat(chunk)
+    except OSError:
+        return False
+    return chunk_stat.st_size == record["size"] and chunk_stat.st_mtime_ns == record["mtime_ns"]
+
+class KnowledgeWriter:
+    """Streams knowledge_N.txt chunks to disk, reusing unchanged files and chunks recorded in the previous manifest."""
+
+    def __init__(self, output_dir, header_lines, previous=None, deduplicate=True, minify=False):
+        self.output_dir = output_dir
+        self.minify = minify
+        # Output written with other options cannot be reused
+        self.options = {"minify": minify}
+        self.header_lines = header_lines
+        header_hash = hashlib.sha256()
+        for line in header_lines():
+            header_hash.update(line.encode("utf-8", "surrogateescape"))
+        self.header_hash = header_hash.hexdigest()
+        self.previous = previous or load_manifest(output_dir, self.options) or {"chunks": [], "files": {}}
+        self.previous_chunks = {}
+        self.chunks = []
+        self.files = {}
+        self.replacements = []
+        self.deduplicate_files = deduplicate
+        self.first_paths = {}  # Content hash -> first path packed with it
+        self.duplicates = 0
+        self.duplicate_bytes = 0
+        self._start_chunk()
+
+    def _previous_record(self, file):
+        record = self.previous["files"].get(file.path)
+        if record and record["size"] == file.size and record["mtime_ns"] == file.mtime_ns:
+            return record
+        return None
+
+    def read_cost(self, file):
+        """Bytes `pack` will read for `file`: nothing when the previous run can be reused."""
+        return 0 if self._previous_record(file) else file.size
+
+    def pack(self, file):
+        """Return the manifest entry for `file`, reading it only if its stat changed; safe on reader threads."""
+        record = self._previous_record(file)
+        if record:
+            return dict(record, path=file.path, data=None, passthrough=None)
+        content_hash, file_content, chars, size, saved = read_source_file(file.path, self.minify)
+        return {
+            "size": file.size,
+            "mtime_ns": file.mtime_ns,
+            "hash": content_hash,
+            "chars": chars,
+            "data": file_content.encode("utf-8", "surrogateescape") if file_content is not None else None,
+            "passthrough": size if file_content is None else None,
+            "path": file.path,
+            "saved": saved,
+        }
+
+    def pack_part(self, item):
+        """Read and frame one line-aligned part of a file split by plan_token_chunks."""
+        with open(item.file.path, "rb") as file:
+            file.seek(item.start)
+            data = file.read(item.end - item.start)
+        label = get_part_label(item)
+        content, saved = minify_decoded(item.file.path, decode_source(data), self.minify)
+        file_content = frame_file_content(label, content)
+        return {
+            "size": item.file.size,
+            "mtime_ns": item.file.mtime_ns,
+            "hash": hashlib.sha256(data).hexdigest(),
+            "chars": len(file_content),
+            "data": file_content.encode("utf-8", "surrogateescape"),
+            "passthrough": None,
+            "path": label,
+            "source": item.file.path,
+            "part": item.part,
+            "saved": saved,
+        }
+
+    def deduplicate(self, entry):
+        """Return `entry` as it should be packed; must be called in output order."""
+        if self.deduplicate_files and entry["hash"] != EMPTY_HASH:
+            first_path = self.first_paths.setdefault(entry["hash"], entry["path"])
+            if first_path != entry["path"]:
+                self.duplicates += 1
+                self.duplicate_bytes += entry["size"]
+                file_content = frame_file_content(entry["path"], f"Duplicate of {first_path}")
+                return dict(entry, data=file_content.encode("utf-8", "surrogateescape"), passthrough=None,
+                            chars=len(file_content), duplicate_of=first_path)
+        if entry.get("duplicate_of"):
+            # Packed as a reference last time, so the previous chunk holds no body to copy
+            _, file_content, chars, size, saved = read_source_file(entry["path"], self.minify)
+            data = file_content.encode("utf-8", "surrogateescape") if file_content is not None else None
+            return dict(entry, data=data, passthrough=None if data is not None else size, chars=chars,
+                        duplicate_of=None, saved=saved)
+        return entry
+
+    def _start_chunk(self):
+        chunk_index = len(self.chunks)
+        output_file = f"knowledge_{chunk_index}.txt"
+        self.chunk = {
+            "file": output_file,
+            "header_hash": self.header_hash if chunk_index == 0 else EMPTY_HASH,
+            "files": [],
+        }
+        self.chunk_path = os.path.join(self.output_dir, output_file)
+        self.chunk_file = None
+        self.matched = []
+
+        previous_chunks = self.previous["chunks"]
+        previous = previous_chunks[chunk_index] if chunk_index < len(previous_chunks) else None
+        # While the chunk keeps matching the previous one nothing is written;
+        # it is only materialized once it diverges
+        self.matching = bool(previous and previous["file"] == output_file
+                             and previous["header_hash"] == self.chunk["header_hash"]
+                             and is_unchanged_chunk(self.chunk_path, previous))
+        self.previous_chunk = previous if self.matching else None
+        if not self.matching:
+            self._materialize()
+
+    def _materialize(self):
+        """Open the chunk's temporary file and write the header plus any files matched so far."""
+        chunk_index = len(self.chunks)
+        self.chunk_file = open(self.chunk_path + ".tmp", "wb")
+        if chunk_index == 0:
+            for line in self.header_lines():
+                self.chunk_file.write(line.encode("utf-8", "surrogateescape"))
+        self.matching = False
+        self.chunk["files"] = []
+        for entry, packed_as in self.matched:
+            self._write_entry(entry, packed_as)
+        self.matched = []
+
+    def add(self, entry):
+        """Append a packed file to the current chunk."""
+        chunk_index = len(self.chunks)
+        position = len(self.chunk["files"])
+        # Passthrough bodies are the source bytes; copied ones keep the previous record's hash
+        if entry["data"] is not None:
+            entry = dict(entry, body_hash=get_body_hash(entry["path"], entry["data"]))
+        elif entry["passthrough"] is not None:
+            entry = dict(entry, body_hash=entry["hash"])
+        # The packed form of a file is identified by its path, content hash and whether it is a reference
+        packed_as = [entry["path"], entry["hash"], entry.get("duplicate_of")]
+        if self.matching:
+            previous_files = self.previous_chunk["files"]
+            if position < len(previous_files) and previous_files[position] == packed_as:
+                previous = self.previous["files"][entry["path"]]
+                self.chunk["files"].append(packed_as)
+                self.matched.append((entry, packed_as))
+                self._record(entry, chunk_index, previous["offset"], previous["length"])
+                return
+            self._materialize()
+        self._write_entry(entry, packed_as)
+
+    def _write_entry(self, entry, packed_as):
+        offset = self.chunk_file.tell()
+        if entry["data"] is not None or entry["passthrough"] is not None:
+            self._write_source(entry["path"], entry["data"], entry["passthrough"])
+        elif not self._copy_previous(entry):
+            # The previous output is gone or does not match its manifest; fall back to the source
+            content_hash, file_content, _, size, _ = read_source_file(entry["path"], self.minify)
+            data = file_content.encode("utf-8", "surrogateescape") if file_content is not None else None
+            entry = dict(entry, body_hash=get_body_hash(entry["path"], data) if data is not None else content_hash)
+            self._write_source(entry["path"], data, size)
+        self.chunk["files"].append(packed_as)
+        self._record(entry, len(self.chunks), offset, self.chunk_file.tell() - offset)
+
+    def _write_source(self, file_path, data, passthrough_size):
+        if data is not None:
+            self.chunk_file.write(data)
+            return
+        self.chunk_file.write(frame_header(file_path).encode("utf-8", "surrogateescape"))
+        with open(file_path, "rb") as source:
+            if not copy_into(source, self.chunk_file, 0, passthrough_size):
+                raise RuntimeError(f"{file_path} changed while it was being packed.")
+        self.chunk_file.write(b"\n")
+
+    def next_chunk(self):
+        """Close the current chunk, even if it is empty, and start the next one."""
+        self._close_chunk()
+        self._start_chunk()
+
+    def _close_chunk(self):
+        if self.matching and len(self.chunk["files"]) == len(self.previous_chunk["files"]):
+            self.chunk["size"] = self.previous_chunk["size"]
+            self.chunk["mtime_ns"] = self.previous_chunk["mtime_ns"]
+            self.chunks.append(self.chunk)
+            print(f"{self.chunk['file']} is unchanged.")
+            return
+        if self.matching:
+            self._materialize()
+        self.chunk["size"] = self.chunk_file.tell()
+        self.chunk_file.close()
+        # os.replace keeps the mtime, so the next run can tell whether the chunk was touched since
+        self.chunk["mtime_ns"] = os.stat(self.chunk_path + ".tmp").st_mtime_ns
+        self.chunks.append(self.chunk)
+        self.replacements.append((self.chunk_path + ".tmp", self.chunk_path))
+        print(f"Source code has been written to {self.chunk['file']}.")
+
+    def _record(self, entry, chunk_index, offset, length):
+        self.files[entry["path"]] = {
+            "size": entry["size"],
+            "mtime_ns": entry["mtime_ns"],
+            "hash": entry["hash"],
+            "body_hash": entry["body_hash"],
+            "chars": entry["chars"],
+            "chunk": chunk_index,
+            "offset": offset,
+            "length": length,
+        }
+        for key in ("duplicate_of", "source", "part", "saved"):
+            if entry.get(key):
+                self.files[entry["path"]][key] = entry[key]
+
+    def _open_previous_chunk(self, chunk_index):
+        # None unless the chunk still has the size and mtime the previous manifest recorded for it
+        if chunk_index not in self.previous_chunks:
+            previous = self.previous["chunks"][chunk_index]
+            try:
+                source = open(os.path.join(self.output_dir, previous["file"]), "rb")
+            except OSError:
+                source = None
+            if source and not is_unchanged_chunk(source.fileno(), previous):
+                source.close()
+                source = None
+            self.previous_chunks[chunk_index] = source
+        return self.previous_chunks[chunk_index]
+
+    def _copy_previous(self, entry):
+        # Only bytes that still frame the file and hash to the recorded body are copied
+        try:
+            source = self._open_previous_chunk(entry["chunk"])
+            if source is None:
+                return False
+            source.seek(entry["offset"])
+            data = source.read(entry["length"])
+        except OSError:
+            return False
+        header = frame_header(entry["path"]).encode("utf-8", "surrogateescape")
+        if (len(data) != entry["length"] or not data.startswith(header) or not data.endswith(b"\n")
+                or get_body_hash(entry["path"], data) != entry["body_hash"]):
+            return False
+        self.chunk_file.write(data)
+        return True
+
+    def finish(self):
+        # Like the chunks before it, the last chunk is only kept if it has files
+        if self.chunk["files"]:
+            self._close_chunk()
+        elif self.chunk_file:
+            self.chunk_file.close()
+            os.remove(self.chunk_path + ".tmp")
+        for file in self.previous_chunks.values():
+            if file:
+                file.close()
+        # The previous manifest and index no longer describe the chunks once they are replaced
+        manifest_path = os.path.join(self.output_dir, MANIFEST_FILE)
+        for path in (manifest_path, os.path.join(self.output_dir, INDEX_FILE)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        for temp_path, output_path in self.replacements:
+            os.replace(temp_path, output_path)
+        # Remove chunks left over from a previous run that produced more of them, even one
+        # whose manifest was rejected for its version or options
+        for name in os.listdir(self.output_dir):
+            match = CHUNK_FILE.fullmatch(name)
+            if match and int(match.group(1)) >= len(self.chunks):
+                os.remove(os.path.join(self.output_dir, name))
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump({"version": MANIFEST_VERSION, "options": self.options, "chunks": self.chunks, "files": self.files}, file)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        self._write_index()
+        if self.duplicates:
+            print(f"Replaced {self.duplicates} duplicate files ({round(self.duplicate_bytes / 1024, 2)} KB) with references.")
+        if self.minify:
+            self._report_minification()
+
+    def _report_minification(self):
+        # Duplicates are not counted: their content is not packed at all
+        saved_by_extension = {}
+        for label, record in self.files.items():
+            if record.get("saved") and not record.get("duplicate_of"):
+                _, extension = os.path.splitext(record.get("source", label))
+                saved_by_extension[extension] = saved_by_extension.get(extension, 0) + record["saved"]
+        total_saved = sum(saved_by_extension.values())
+        print(f"Minification saved {round(total_saved / 1024, 2)} KB (~{estimate_tokens(total_saved)} tokens):")
+        for extension, saved in sorted(saved_by_extension.items(), key=lambda item: item[1], reverse=True):
+            print(f"{extension}: {round(saved / 1024, 2)} KB (~{estimate_tokens(saved)} tokens)")
+
+    def _write_index(self):
+        """Write the lookup index: each packed path mapped to [chunk, offset, length, sha256] of its content."""
+        body_ranges = {}
+        for label, record in self.files.items():
+            header_length = len(frame_header(label).encode("utf-8", "surrogateescape"))
+            body_ranges[label] = [
+                self.chunks[record["chunk"]]["file"],
+                record["offset"] + header_length,
+                record["length"] - header_length - 1,  # Without the newline closing the frame
+                record["body_hash"],
+            ]
+        parts = {}
+        for label, record in self.files.items():
+            body_range = body_ranges[record.get("duplicate_of", label)]
+            parts.setdefault(record.get("source", label), []).append((record.get("part", 1), body_range))
+        files = {path: [body_range for _, body_range in sorted(file_parts)] for path, file_parts in parts.items()}
+        index_path = os.path.join(self.output_dir, INDEX_FILE)
+        with open(index_path + ".tmp", "w") as file:
+            json.dump({"version": INDEX_VERSION, "files": files}, file, separators=(",", ":"))
+        os.replace(index_path + ".tmp", index_path)
+
+def load_knowledge_index(output_dir):
+    """Load the lookup index written next to the knowledge files, mapping each packed path to its content ranges."""
+    with open(os.path.join(output_dir, INDEX_FILE), "r") as file:
+        index = json.load(file)
+    if index.get("version") != INDEX_VERSION:
+        raise RuntimeError(f"Unsupported knowledge index version in {output_dir}.")
+    return index["files"]
+
+def read_packed_files(output_dir, paths, knowledge_index=None):
+    """Return {path: packed content} for the given paths, reading each chunk once in offset order."""
+    if knowledge_index is None:
+        knowledge_index = load_knowledge_index(output_dir)
+    reads = []
+    for path in paths:
+        for part, (chunk_file, offset, length, _) in enumerate(knowledge_index.get(path, ())):
+            reads.append((chunk_file, offset, length, path, part))
+    reads.sort()
+    parts = {}
+    chunk_file = None
+    try:
+        for chunk_name, offset, length, path, part in reads:
+            if chunk_file is None or chunk_file.name != os.path.join(output_dir, chunk_name):
+                if chunk_file:
+                    chunk_file.close()
+                chunk_file = open(os.path.join(output_dir, chunk_name), "rb")
+            chunk_file.seek(offset)
+            parts.setdefault(path, {})[part] = chunk_file.read(length)
+    finally:
+        if chunk_file:
+            chunk_file.close()
+    return {path: b"".join(file_parts[part] for part in sorted(file_parts)).decode("utf-8", "surrogateescape")
+            for path, file_parts in parts.items()}
+
+def read_packed_file(output_dir, path, knowledge_index=None):
+    """Return the packed content of one file, or None if it was not packed."""
+    return read_packed_files(output_dir, [path], knowledge_index).get(path)
+
+def read_ahead(items, load, workers, max_pending_bytes, size_of):
+    """Yield (item, load(item)) in order while loading ahead on a thread pool, up to `max_pending_bytes`."""
+    if workers <= 1:
+        for item in items:
+            yield item, load(item)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        pending_bytes = 0
+        for item in items:
+            size = size_of(item)
+            while pending and (len(pending) >= workers * 4 or pending_bytes + size > max_pending_bytes):
+                done_item, future, done_size = pending.popleft()
+                pending_bytes -= done_size
+                yield done_item, future.result()
+            pending.append((item, executor.submit(load, item), size))
+            pending_bytes += size
+        while pending:
+            done_item, future, _ = pending.popleft()
+            yield done_item, future.result()
+
+# How much of a file is read to tell text from binary
+SNIFF_BYTES = 8192
+
+def sniff_file(file_path):
+    """Return why a file should not be packed judging by its first few KB, or None if it looks like text."""
+    try:
+        with open(file_path, "rb") as file:
+            head = file.read(SNIFF_BYTES)
+    except OSError as e:
+        return f"unreadable: {e.strerror}"
+    if b"\0" in head:
+        return "binary"
+    try:
+        # Not final, so a multi-byte character cut off at the end of the sample is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return "not UTF-8 text"
+    return None
+
+def parse_size_caps(specs):
+    """Parse --max-size values such as ".json=256" into {extension: KB}."""
+    caps = {}
+    for spec in specs or []:
+        extension, _, size = spec.partition("=")
+        extension = extension.strip()
+        try:
+            caps[extension if extension.startswith(".") else "." + extension] = float(size)
+        except ValueError:
+            raise RuntimeError(f"Invalid size cap '{spec}': expected EXTENSION=KB, e.g. .json=256.")
+    return caps
+
+def classify_files(index, specified_extensions, max_file_kb=None, extension_caps=None, known_files=None, workers=8):
+    """Record binary, unreadable and oversized files in `index.skipped`, reusing the manifest for unchanged ones."""
+    extension_caps = extension_caps or {}
+    known_files = known_files or {}
+    to_sniff = []
+    for file in iter_packed_files(index, specified_extensions):
+        cap = extension_caps.get(file.extension, max_file_kb)
+        record = known_files.get(file.path)
+        if cap is not None and file.size > cap * 1024:
+            index.skipped[file.path] = f"larger than {cap:g} KB"
+        elif not (record and record["size"] == file.size and record["mtime_ns"] == file.mtime_ns):
+            to_sniff.append(file)
+    for file, reason in read_ahead(to_sniff, lambda file: sniff_file(file.path), workers, 0, lambda file: 0):
+        if reason:
+            index.skipped[file.path] = reason
+
+def iter_packed_files(index, specified_extensions):
+    for node in index.walk():
+        for file in node.files:
+            if (not specified_extensions or file.extension in specified_extensions) and file.path not in index.skipped:
+                yield file
+
+def iter_file_tree(index, specified_extensions):
+    """Yield the chunk 0 header line by line, straight from the scan index."""
+    yield "File Tree:\n"
+    separator = ""
+    for node in index.walk():
+        indent = " " * 4 * node.level
+        yield f"{separator}{indent}{node.name}/"
+        separator = "\n"
+        for file in node.files:
+            if not specified_extensions or file.extension in specified_extensions:
+                reason = index.skipped.get(file.path)
+                yield f"\n{indent}    {file.name} (skipped: {reason})" if reason else f"\n{indent}    {file.name}"
+    yield "\n\nFile Contents:\n"
+
+# Average characters per token for source code; the built-in estimator only
+# needs the file size, so planning a token-budget run reads nothing
+CHARS_PER_TOKEN = 3.5
+
+# One file, or one line-aligned part [start, end) of an oversized file, in a token-budget plan
+PackItem = namedtuple("PackItem", ["file", "order", "tokens", "part", "parts", "start", "end"])
+
+def estimate_tokens(chars):
+    return math.ceil(chars / CHARS_PER_TOKEN)
+
+def load_tokenizer(spec):
+    """Return a token counter for `spec`: tiktoken[:encoding] or module:function."""
+    name, _, attribute = spec.partition(":")
+    if name == "tiktoken":
+        try:
+            import tiktoken
+        except ImportError:
+            raise RuntimeError("The tiktoken package is required for --tokenizer tiktoken.")
+        encoding = tiktoken.get_encoding(attribute or "cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    if not attribute:
+        raise RuntimeError(f"Invalid tokenizer '{spec}': expected tiktoken[:encoding] or module:function.")
+    try:
+        return getattr(importlib.import_module(name), attribute)
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f"Unable to load tokenizer '{spec}': {e}")
+
+def get_part_label(item):
+    return f"{item.file.path} (part {item.part} of {item.parts})"
+
+def count_file_tokens(file, count_tokens):
+    if count_tokens is None:
+        return estimate_tokens(len(frame_header(file.path)) + file.size + 1)
+    with open(file.path, "rb") as f:
+        return count_tokens(frame_file_content(file.path, decode_source(f.read())))
+
+def split_oversized_file(file, order, token_budget, count_tokens):
+    """Split a file that does not fit in one chunk into line-aligned PackItems."""
+    with open(file.path, "rb") as f:
+        data = f.read()
+    count = count_tokens or (lambda text: estimate_tokens(len(text)))
+    if decode_source(data) is UNDECODABLE_CONTENT:
+        tokens = count(frame_file_content(file.path, UNDECODABLE_CONTENT))
+        return [PackItem(file, order, tokens, 1, 1, 0, len(data))]
+
+    overhead = count(frame_file_content(f"{file.path} (part 9999 of 9999)", ""))
+    capacity = max(token_budget - overhead, 1)
+    boundaries = [0]
+    part_tokens = []
+    tokens = 0
+    position = 0
+    while position < len(data):
+        end = data.find(b"\n", position)
+        end = len(data) if end == -1 else end + 1
+        line_tokens = count(data[position:end].decode("utf-8"))
+        if tokens and tokens + line_tokens > capacity:
+            boundaries.append(position)
+            part_tokens.append(tokens + overhead)
+            tokens = 0
+        tokens += line_tokens
+        position = end
+    boundaries.append(len(data))
+    part_tokens.append(tokens + overhead)
+    parts = len(part_tokens)
+    return [PackItem(file, order, part_tokens[i], i + 1, parts, boundaries[i], boundaries[i + 1]) for i in range(parts)]
+
+def plan_token_chunks(index, specified_extensions, token_budget, count_tokens=None):
+    """Bin-pack files, first fit decreasing within each directory, into chunks of at most `token_budget` tokens."""
+    count = count_tokens or (lambda text: estimate_tokens(len(text)))
+    header_tokens = sum(count(line) for line in iter_file_tree(index, specified_extensions))
+
+    items = []
+    for order, file in enumerate(iter_packed_files(index, specified_extensions)):
+        tokens = count_file_tokens(file, count_tokens)
+        if tokens > token_budget:
+            items.extend(split_oversized_file(file, order, token_budget, count_tokens))
+        else:
+            items.append(PackItem(file, order, tokens, 1, 1, 0, file.size))
+
+    chunks = [[]]
+    remaining = [token_budget - header_tokens]
+    directory_chunks = {}
+    # sorted() is stable, so equally sized files keep their tree order
+    for item in sorted(items, key=lambda item: item.tokens, reverse=True):
+        directory = os.path.dirname(item.file.path)
+        target = next((i for i in directory_chunks.get(directory, ()) if remaining[i] >= item.tokens), None)
+        if target is None:
+            target = next((i for i, room in enumerate(remaining) if room >= item.tokens), None)
+        if target is None:
+            chunks.append([])
+            remaining.append(token_budget)
+            target = len(chunks) - 1
+        chunks[target].append(item)
+        remaining[target] -= item.tokens
+        directory_chunks.setdefault(directory, {})[target] = None
+    for chunk in chunks:
+        chunk.sort(key=lambda item: (item.order, item.part))
+    return chunks
+
+def extract_source_code(index, specified_extensions, file_size_limit, output_dir=".", workers=8, read_ahead_mb=64,
+                        token_budget=None, count_tokens=None, max_file_kb=1024, extension_caps=None, deduplicate=True,
+                        minify=False):
+    previous = load_manifest(output_dir, {"minify": minify})
+    classify_files(index, specified_extensions, max_file_kb, extension_caps, previous and previous["files"], workers)
+    if index.skipped:
+        print(f"Skipping {len(index.skipped)} binary, unreadable or oversized files; see the file tree for reasons.")
+    writer = KnowledgeWriter(output_dir, lambda: iter_file_tree(index, specified_extensions), previous, deduplicate, minify)
+    if token_budget:
+        pack_by_tokens(writer, index, specified_extensions, token_budget, count_tokens, workers, read_ahead_mb)
+        return writer
+    current_file_size = 0
+
+    # Files are read on a thread pool but consumed in tree order, so the output matches a sequential run
+    files = iter_packed_files(index, specified_extensions)
+    for file, entry in read_ahead(files, writer.pack, workers, read_ahead_mb * 1024 * 1024, writer.read_cost):
+        entry = writer.deduplicate(entry)
+        file_content_size = entry["chars"] / 1024  # Convert to KB
+        current_file_size += file_content_size
+        if current_file_size > file_size_limit:
+            writer.next_chunk()
+            current_file_size = file_content_size
+        writer.add(entry)
+    writer.finish()
+    return writer
+
+def pack_by_tokens(writer, index, specified_extensions, token_budget, count_tokens, workers, read_ahead_mb):
+    chunks = plan_token_chunks(index, specified_extensions, token_budget, count_tokens)
+    planned = ((chunk_index, item) for chunk_index, chunk in enumerate(chunks) for item in chunk)
+
+    def load(planned_item):
+        _, item = planned_item
+        return writer.pack_part(item) if item.parts > 1 else writer.pack(item.file)
+
+    def read_cost(planned_item):
+        _, item = planned_item
+        return item.end - item.start if item.parts > 1 else writer.read_cost(item.file)
+
+    for (chunk_index, _), entry in read_ahead(planned, load, workers, read_ahead_mb * 1024 * 1024, read_cost):
+        while len(writer.chunks) < chunk_index:
+            writer.next_chunk()
+        # The plan budgets duplicates at full size, since their hashes are only known once they are read
+        writer.add(writer.deduplicate(entry))
+    writer.finish()
+    total_tokens = sum(item.tokens for chunk in chunks for item in chunk)
+    print(f"Packed an estimated {total_tokens} tokens into {len(writer.chunks)} chunks of up to {token_budget} tokens.")
+
+def resolve_pack_options(project_dirs, max_size=None, tokenizer=None):
+    """Validate the inputs shared by the CLI and pack_repository; returns (absolute dirs, size caps, token counter)."""
+    project_dirs = [os.path.abspath(project_dir) for project_dir in project_dirs]
+    for project_dir in project_dirs:
+        if not os.path.isdir(project_dir):
+            raise RuntimeError(f"The provided directory does not exist: {project_dir}")
+    extension_caps = parse_size_caps(max_size)
+    count_tokens = load_tokenizer(tokenizer) if tokenizer else None
+    return project_dirs, extension_caps, count_tokens
+
+def pack_repository(project_dirs, output_dir=".", file_size_limit=1000, specified_extensions=None, excluded_paths=None,
+                    use_git=False, since=None, workers=8, read_ahead_mb=64, token_budget=None, tokenizer=None,
+                    max_file_kb=1024, max_size=None, deduplicate=True, minify=False):
+    """Pack `project_dirs` into `output_dir` without prompting and return a summary of the run."""
+    started = time.perf_counter()
+    project_dirs, extension_caps, count_tokens = resolve_pack_options(project_dirs, max_size, tokenizer)
+    specified_extensions = specified_extensions or []
+
+    index = build_scan_index(project_dirs, excluded_paths or [], use_git, since)
+    os.makedirs(output_dir, exist_ok=True)
+    writer = extract_source_code(index, specified_extensions, file_size_limit, output_dir, workers, read_ahead_mb,
+                                 token_budget, count_tokens, max_file_kb, extension_caps, deduplicate, minify)
+    packed_files = list(iter_packed_files(index, specified_extensions))
+    return {
+        "project_dirs": project_dirs,
+        "output_dir": output_dir,
+        "files": len(packed_files),
+        "bytes": sum(file.size for file in packed_files),
+        "skipped": len(index.skipped),
+        "chunks": len(writer.chunks),
+        "seconds": time.perf_counter() - started,
+    }
+
+def load_batch_config(config_path):
+    """Read a JSON batch config into (name, pack_repository arguments) pairs.
+
+    Keys: "output_dir", "defaults" and "repos", each a directory or an object of arguments; paths are relative to the config.
+    """
+    with open(config_path, "r") as file:
+        config = json.load(file)
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    output_root = os.path.join(base_dir, config.get("output_dir", "."))
+    jobs = []
+    names = set()
+    for repo in config.get("repos", []):
+        if isinstance(repo, str):
+            repo = {"project_dirs": [repo]}
+        job = dict(config.get("defaults", {}), **repo)
+        if isinstance(job.get("project_dirs"), str):
+            job["project_dirs"] = [job["project_dirs"]]
+        if not job.get("project_dirs"):
+            raise RuntimeError(f"Repository without project_dirs in {config_path}: {repo}")
+        job["project_dirs"] = [os.path.join(base_dir, project_dir) for project_dir in job["project_dirs"]]
+        name = job.pop("name", None) or os.path.basename(os.path.normpath(job["project_dirs"][0]))
+        if name in names:
+            raise RuntimeError(f"Two repositories are named {name} in {config_path}; give one of them a different name")
+        names.add(name)
+        job.setdefault("output_dir", name)
+        job["output_dir"] = os.path.join(output_root, job["output_dir"])
+        jobs.append((name, job))
+    return jobs
+
+def _pack_batch_job(name, job):
+    # Runs in a worker process: the per-repo chatter is dropped, and failures
+    # are returned rather than raised so one bad repository does not stop the rest
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return dict(pack_repository(**job), name=name)
+    except Exception as e:
+        return {"name": name, "output_dir": job.get("output_dir"), "error": f"{type(e).__name__}: {e}"}
+
+def pack_batch(config_path, processes=None):
+    """Pack every repository of a batch config across a process pool, print a summary and return the results."""
+    jobs = load_batch_config(config_path)
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_pack_batch_job, name, job) for name, job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if "error" in result:
+                print(f"[{len(results)}/{len(jobs)}] {result['name']}: failed: {result['error']}")
+            else:
+                print(f"[{len(results)}/{len(jobs)}] {result['name']}: {result['files']} files, "
+                      f"{round(result['bytes'] / 1024, 2)} KB in {result['chunks']} chunks ({round(result['seconds'], 2)}s)")
+    elapsed = time.perf_counter() - started
+
+    packed = [result for result in results if "error" not in result]
+    failed = [result for result in results if "error" in result]
+    total_files = sum(result["files"] for result in packed)
+    total_mb = sum(result["bytes"] for result in packed) / (1024 * 1024)
+    print(f"\nPacked {len(packed)} of {len(jobs)} repositories: {total_files} files, {round(total_mb, 2)} MB "
+          f"in {round(elapsed, 2)}s ({round(total_mb / elapsed, 2) if elapsed else 0} MB/s, "
+          f"{round(total_files / elapsed, 1) if elapsed else 0} files/s)")
+    for result in sorted(failed, key=lambda result: result["name"]):
+        print(f"Failed: {result['name']}: {result['error']}")
+    return results
+
+def main(argv=None):
+    # Get the project directories from command line arguments
+    parser = argparse.ArgumentParser(description="Load source code into annotated knowledge files for large prompts.")
+    parser.add_argument("project_dirs", nargs="*", help="One or more directories to pack")
+    parser.add_argument("--git", action="store_true", help="List files from the git index instead of walking the directories")
+    parser.add_argument("--since", metavar="REF", help="Only pack files changed against REF (implies --git)")
+    parser.add_argument("--output-dir", default=".", help="Directory for the knowledge files and their manifest (default: current directory)")
+    parser.add_argument("--workers", type=int, default=8, help="Threads reading files ahead of the writer; 1 reads sequentially (default: 8)")
+    parser.add_argument("--read-ahead-mb", type=float, default=64, help="Cap on file data read ahead of the writer, in MB (default: 64)")
+    parser.add_argument("--token-budget", type=int, help="Bin-pack files into chunks of at most this many tokens instead of splitting by KB")
+    parser.add_argument("--tokenizer", help="Exact token counter for --token-budget: tiktoken[:encoding] or module:function (default: built-in estimate)")
+    parser.add_argument("--max-file-kb", type=float, default=1024, help="Skip files larger than this many KB (default: 1024)")
+    parser.add_argument("--max-size", action="append", metavar="EXT=KB", help="Size cap for one extension, e.g. .json=256; may be repeated")
+    parser.add_argument("--keep-duplicates", action="store_true", help="Pack every copy of identical files instead of referencing the first one")
+    parser.add_argument("--minify", action="store_true", help="Strip comments, docstrings and redundant whitespace from packed files")
+    parser.add_argument("--batch", metavar="CONFIG", help="Pack the repositories of a JSON batch config without prompting (see load_batch_config)")
+    parser.add_argument("--processes", type=int, help="Repositories packed at once in --batch mode (default: one per CPU)")
+    parser.add_argument("--lookup", action="append", metavar="PATH", help="Print a file's packed content from the knowledge files in --output-dir instead of packing; may be repeated")
+    args = parser.parse_args(argv)
+
+    if args.lookup:
+        try:
+            knowledge_index = load_knowledge_index(args.output_dir)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Unable to load the knowledge index: {e}")
+            sys.exit(1)
+        # Paths are packed as absolute paths, but accept them relative to the current directory too
+        paths = [path if path in knowledge_index else os.path.abspath(path) for path in args.lookup]
+        contents = read_packed_files(args.output_dir, paths, knowledge_index)
+        for path in paths:
+            if path in contents:
+                sys.stdout.write(frame_file_content(path, contents[path]))
+            else:
+                print(f"Not found in the knowledge index: {path}", file=sys.stderr)
+        sys.exit(0 if len(contents) == len(set(paths)) else 1)
+
+    if args.batch:
+        try:
+            results = pack_batch(args.batch, args.processes)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Unable to load the batch config: {e}")
+            sys.exit(1)
+        sys.exit(1 if any("error" in result for result in results) else 0)
+
+    if not args.project_dirs:
+        parser.error("Please provide one or more directory paths as command line arguments.")
+
+    try:
+        project_dirs, extension_caps, count_tokens = resolve_pack_options(args.project_dirs, args.max_size, args.tokenizer)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+    # Ask for the file size limit in KB, unless chunks are sized by tokens
+    file_size_limit = None
+    if not args.token_budget:
+        file_size_limit = float(input("Enter the file size limit in KB (default: 1000): ") or "1000")
+
+    # Scan the project directories once; every size, count and prompt below is answered from the index
+    excluded_paths = []
+    try:
+        index = build_scan_index(project_dirs, excluded_paths, use_git=args.git, since=args.since)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+    # Calculate the total size of the source code files
+    extension_sizes, total_size = get_extension_sizes(index)
+    print("File sizes per extension (KB):")
+    for extension, size in extension_sizes.items():
+        print(f"{extension}: {size} KB")
+    print(f"Total size: {total_size} KB")
+
+    specified_extensions = input("Enter the file extensions to include (comma-separated, leave empty to include all): ").split(',')
+    specified_extensions = [ext.strip() for ext in specified_extensions if ext.strip()]
+
+    total_size = get_total_source_code_size(index, specified_extensions)
+    # convert to KB
+    total_size_kb = round(total_size / 1024, 2)
+    print(f"Estimated size of knowledge.txt: {total_size_kb} KB")
+
+    generate_file = False
+    for node in index.walk():
+        exclude, extensions = prompt_user_for_exclusion(index, node, specified_extensions, total_size_kb)
+        if exclude:
+            node.excluded = True  # Skip the directory and its subdirectories when extracting
+        elif extensions == specified_extensions:
+            generate_file = True
+            break
+
+    if generate_file:
+        # Extract the source code
+        os.makedirs(args.output_dir, exist_ok=True)
+        extract_source_code(index, specified_extensions, file_size_limit, args.output_dir, args.workers, args.read_ahead_mb,
+                            args.token_budget, count_tokens, args.max_file_kb, extension_caps,
+                            not args.keep_duplicates, args.minify)
+    else:
+        print("Generation of knowledge.txt was not confirmed.")
@@ -0,0 +1,60 @@
+import json
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# A request as the mock received it; `query` maps each parameter to its last value
+MockRequest = namedtuple("MockRequest", ["path", "query", "headers"])
+
+class MockGitHub:
+    """A local stand-in for the GitHub API, for pointing GITHUB_API_URL (or github_api.API_URL) at.
+
+    `routes` maps a path to a function taking a MockRequest and returning (status, headers, body),
+    where a body that is not bytes is sent as JSON. Unknown paths get a 404.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep connections open, as GitHub does
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                request = MockRequest(url.path, query, dict(self.headers))
+                with mock.lock:
+                    mock.requests.append(request)
+                route = mock.routes.get(url.path)
+                status, headers, body = route(request) if route else (404, {}, {"message": "Not Found"})
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, str(value))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def requests_to(self, path):
+        with self.lock:
+            return [request for request in self.requests if request.path == path]
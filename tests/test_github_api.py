@@ -0,0 +1,147 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+import github_api
+from github_store import GitHubStore
+from mock_github import MockGitHub
+
+class FakeClock:
+    """Stands in for github_api's time module: sleeping is recorded and moves the clock on instead of blocking."""
+
+    def __init__(self):
+        self.now = time.time()
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def github(monkeypatch):
+    with MockGitHub() as mock:
+        monkeypatch.setattr(github_api, "API_URL", mock.url)
+        yield mock
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(github_api, "time", fake)
+    return fake
+
+def paginated(mock, path, pages, headers=None):
+    # Serves pages[n - 1] for ?page=n, linking each page to the next like GitHub does
+    def route(request):
+        page = int(request.query.get("page", 1))
+        response_headers = dict(headers or {})
+        if page < len(pages):
+            response_headers["Link"] = f'<{mock.url}{path}?per_page=2&page={page + 1}>; rel="next", <{mock.url}{path}?per_page=2&page={len(pages)}>; rel="last"'
+        return 200, response_headers, pages[page - 1]
+    return route
+
+def test_get_all_pages_follows_link_headers(github):
+    github.routes["/orgs/acme/repos"] = paginated(github, "/orgs/acme/repos", [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]])
+    session = github_api.create_session("token")
+    items = github_api.get_all_pages(session, "/orgs/acme/repos", {"per_page": 2})
+    assert [item["id"] for item in items] == [1, 2, 3, 4, 5]
+    requests = github.requests_to("/orgs/acme/repos")
+    assert [request.query.get("page") for request in requests] == [None, "2", "3"]
+    assert all(request.query["per_page"] == "2" for request in requests)
+    assert all(request.headers["Authorization"] == "Bearer token" for request in requests)
+
+def test_get_all_pages_unwraps_search_items(github, capsys):
+    pages = [{"total_count": 5, "items": [{"id": 1}, {"id": 2}]}, {"total_count": 5, "items": [{"id": 3}]}]
+    github.routes["/search/issues"] = paginated(github, "/search/issues", pages)
+    session = github_api.create_session("token")
+    items = github_api.get_all_pages(session, "/search/issues", {"q": "org:acme"})
+    assert [item["id"] for item in items] == [1, 2, 3]
+    assert "matched 5 results, but only 3 could be fetched" in capsys.readouterr().err
+
+def test_get_all_pages_raises_on_errors(github):
+    session = github_api.create_session("token")
+    with pytest.raises(github_api.GitHubAPIError) as error:
+        github_api.get_all_pages(session, "/orgs/missing/repos")
+    assert error.value.status_code == 404
+
+def test_fetch_all_pages_keeps_query_order(github):
+    def route(request):
+        number = int(request.query["q"])
+        time.sleep((5 - number) * 0.05)  # Later queries answer first
+        return 200, {}, {"total_count": 1, "items": [{"id": number}]}
+
+    github.routes["/search/issues"] = route
+    session = github_api.create_session("token")
+    queries = [("/search/issues", {"q": str(number)}) for number in range(5)]
+    queries.insert(2, ("/orgs/missing/repos", None))
+    results = github_api.fetch_all_pages(session, queries, max_workers=6)
+    assert [items[0]["id"] for items, error in results if error is None] == [0, 1, 2, 3, 4]
+    assert results[2][0] is None and results[2][1].status_code == 404
+
+def test_store_answers_not_modified_responses(github, tmp_path):
+    pages = [[{"id": 1}], [{"id": 2}]]
+    route = paginated(github, "/orgs/acme/repos", pages)
+
+    def conditional(request):
+        page = request.query.get("page", "1")
+        if request.headers.get("If-None-Match") == f'"page-{page}"':
+            return 304, {}, None
+        status, headers, body = route(request)
+        return status, dict(headers, ETag=f'"page-{page}"'), body
+
+    github.routes["/orgs/acme/repos"] = conditional
+    store = GitHubStore(str(tmp_path / "store.sqlite3"))
+    session = github_api.create_session("token", cache=store)
+    first = github_api.get_all_pages(session, "/orgs/acme/repos", {"per_page": 2})
+    second = github_api.get_all_pages(session, "/orgs/acme/repos", {"per_page": 2})
+    assert first == second == [{"id": 1}, {"id": 2}]
+    requests = github.requests_to("/orgs/acme/repos")
+    assert len(requests) == 4
+    assert [request.headers.get("If-None-Match") for request in requests[2:]] == ['"page-1"', '"page-2"']
+    store.close()
+
+def test_search_responses_are_not_cached(github, tmp_path):
+    github.routes["/search/issues"] = lambda request: (200, {"ETag": '"search"'}, {"total_count": 0, "items": []})
+    store = GitHubStore(str(tmp_path / "store.sqlite3"))
+    session = github_api.create_session("token", cache=store)
+    github_api.get_json(session, "/search/issues", {"q": "org:acme"})
+    github_api.get_json(session, "/search/issues", {"q": "org:acme"})
+    assert all("If-None-Match" not in request.headers for request in github.requests_to("/search/issues"))
+    store.close()
+
+def test_rate_limited_response_is_retried_after_reset(github, clock):
+    responses = [
+        (403, {"X-RateLimit-Remaining": 0, "X-RateLimit-Reset": int(clock.now) + 30}, {"message": "API rate limit exceeded"}),
+        (200, {"X-RateLimit-Remaining": 4999, "X-RateLimit-Reset": int(clock.now) + 3600}, {"login": "acme"}),
+    ]
+    github.routes["/orgs/acme"] = lambda request: responses.pop(0)
+    session = github_api.create_session("token")
+    assert github_api.get_json(session, "/orgs/acme") == {"login": "acme"}
+    assert len(github.requests_to("/orgs/acme")) == 2
+    assert len(clock.sleeps) == 1 and 29 <= clock.sleeps[0] <= 32
+
+def test_spent_quota_holds_requests_until_reset(github, clock):
+    reset = int(clock.now) + 60
+    github.routes["/orgs/acme"] = lambda request: (200, {"X-RateLimit-Remaining": 0, "X-RateLimit-Reset": reset,
+                                                         "X-RateLimit-Resource": "core"}, {"login": "acme"})
+    github.routes["/search/issues"] = lambda request: (200, {}, {"total_count": 0, "items": []})
+    session = github_api.create_session("token")
+    github_api.get_json(session, "/orgs/acme")
+    assert clock.sleeps == []
+    # Other buckets keep their own quota
+    github_api.get_json(session, "/search/issues", {"q": "org:acme"})
+    assert clock.sleeps == []
+    github_api.get_json(session, "/orgs/acme")
+    assert len(clock.sleeps) == 1 and clock.now >= reset
+    assert len(github.requests_to("/orgs/acme")) == 2
+
+def test_secondary_rate_limit_honours_retry_after(github, clock):
+    responses = [(429, {"Retry-After": 7}, {"message": "secondary rate limit"}), (200, {}, {"login": "acme"})]
+    github.routes["/orgs/acme"] = lambda request: responses.pop(0)
+    session = github_api.create_session("token")
+    assert github_api.get_json(session, "/orgs/acme") == {"login": "acme"}
+    assert clock.sleeps == [7]
@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import repo_prompt_generator as rpg
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+# Each case is ({ignore file: lines}, files); every file is checked against git check-ignore
+CASES = {
+    "negation": (
+        {".gitignore": ["*.log", "!keep.log", "build/", "!build/kept.txt"]},
+        ["a.log", "keep.log", "sub/b.log", "sub/keep.log", "build/out.txt", "build/kept.txt", "main.py"],
+    ),
+    "anchored": (
+        {".gitignore": ["/root.txt", "docs/*.md", "/sub/only/"]},
+        ["root.txt", "sub/root.txt", "docs/a.md", "docs/deep/b.md", "sub/docs/a.md", "sub/only/x.txt", "only/x.txt"],
+    ),
+    "directory only": (
+        {".gitignore": ["cache/", "out/"]},
+        ["cache/a.txt", "src/cache/b.txt", "src/cache.txt", "out", "deep/out/c.txt"],
+    ),
+    "double star": (
+        {".gitignore": ["**/tmp", "a/**/b.txt", "logs/**", "**/gen/*.py"]},
+        ["tmp/x.txt", "src/tmp/y.txt", "a/b.txt", "a/x/b.txt", "a/x/y/b.txt", "b.txt", "logs/today.txt",
+         "src/logs/today.txt", "gen/a.py", "pkg/gen/b.py", "pkg/gen/sub/c.py"],
+    ),
+    "escapes": (
+        {".gitignore": ["# a comment", r"\#hash.txt", r"\!bang.txt", "trailing.txt   ", "space\\ ", r"star\*.txt"]},
+        ["#hash.txt", "!bang.txt", "trailing.txt", "space ", "space", "star*.txt", "starx.txt", "# a comment"],
+    ),
+    "bracket classes": (
+        {".gitignore": ["file[0-9].txt", "x[!a].txt", "y[^a-c].txt", "[]]z.txt"]},
+        ["file1.txt", "filea.txt", "xa.txt", "xb.txt", "ya.txt", "yd.txt", "]z.txt", "?z.txt"],
+    ),
+    "question mark": (
+        {".gitignore": ["?.txt", "dir?/"]},
+        ["a.txt", "ab.txt", "dir1/x.txt", "dir/x.txt", "sub/b.txt"],
+    ),
+    "nested ignore files": (
+        {".gitignore": ["*.tmp", "/top/"], "sub/.gitignore": ["!keep.tmp", "/local.txt", "inner/"],
+         "sub/deeper/.gitignore": ["*.txt", "!wanted.txt"]},
+        ["a.tmp", "keep.tmp", "sub/keep.tmp", "sub/other.tmp", "sub/local.txt", "sub/x/local.txt", "local.txt",
+         "sub/inner/a.py", "inner/a.py", "sub/deeper/a.txt", "sub/deeper/wanted.txt", "sub/wanted.txt", "top/a.py"],
+    ),
+    "negated node_modules": (
+        {".gitignore": ["*.log"], "sub/.gitignore": ["!node_modules", "!node_modules/", "!*.log"]},
+        ["node_modules/pkg/index.js", "sub/node_modules/pkg/index.js", "sub/a.log", "a.log", "sub/b.js"],
+    ),
+}
+
+def make_repo(root, ignore_files, files):
+    subprocess.run(["git", "init", "-q", root], check=True)
+    for name, lines in ignore_files.items():
+        os.makedirs(os.path.dirname(os.path.join(root, name)), exist_ok=True)
+        with open(os.path.join(root, name), "w") as file:
+            file.write("\n".join(lines) + "\n")
+    for name in files:
+        os.makedirs(os.path.dirname(os.path.join(root, name)), exist_ok=True)
+        with open(os.path.join(root, name), "w") as file:
+            file.write("x\n")
+
+def git_ignored(root, paths):
+    result = subprocess.run(["git", "check-ignore", "--stdin", "-z"], cwd=root, capture_output=True,
+                            input="\0".join(paths).encode() + b"\0")
+    assert result.returncode in (0, 1), result.stderr
+    return {path for path in result.stdout.decode().split("\0") if path}
+
+def scanned(root):
+    index = rpg.build_scan_index([root], [])
+    return {os.path.relpath(file.path, root).replace(os.sep, "/") for file in rpg.iter_packed_files(index, [])}
+
+@pytest.mark.parametrize("ignore_files, files", CASES.values(), ids=list(CASES))
+def test_matches_git_check_ignore(tmp_path, ignore_files, files):
+    root = str(tmp_path / "repo")
+    make_repo(root, ignore_files, files)
+    paths = list(files) + list(ignore_files)
+    # node_modules is always left out, even where an ignore file negates it
+    expected = git_ignored(root, paths) | {path for path in paths if "node_modules" in path.split("/")}
+    assert {path for path in paths if path not in scanned(root)} == expected
+
+def test_git_info_exclude_is_read(tmp_path):
+    root = str(tmp_path / "repo")
+    make_repo(root, {}, ["a.txt", "b.txt"])
+    with open(os.path.join(root, ".git", "info", "exclude"), "a") as file:
+        file.write("a.txt\n")
+    assert scanned(root) == {"b.txt"}
+
+def test_exclusions_cannot_be_negated(tmp_path):
+    root = str(tmp_path / "repo")
+    make_repo(root, {".gitignore": ["!vendor/", "!vendor"], "sub/.gitignore": ["!node_modules"]},
+              ["vendor/a.py", "sub/node_modules/b.js", "src/c.py"])
+    index = rpg.build_scan_index([root], ["vendor"])
+    packed = {os.path.relpath(file.path, root).replace(os.sep, "/") for file in rpg.iter_packed_files(index, [])}
+    assert packed == {".gitignore", "sub/.gitignore", "src/c.py"}
+
+def test_is_ignored_directories():
+    matcher = rpg.IgnoreMatcher().add_layer("", ["cache/", "*.log"]).add_layer("sub", ["!*.log", "/local/"])
+    assert matcher.is_ignored("cache", is_dir=True)
+    assert not matcher.is_ignored("cache")
+    assert matcher.is_ignored("a.log")
+    assert not matcher.is_ignored("sub/a.log")
+    assert matcher.is_ignored("sub/local", is_dir=True)
+    assert not matcher.is_ignored("local", is_dir=True)
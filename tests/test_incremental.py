@@ -0,0 +1,158 @@
+import os
+import shutil
+
+import pytest
+
+import repo_prompt_generator as rpg
+
+FILES = {
+    "app/main.py": '"""Entry point."""\n\ndef main():\n    # Run it\n    return 1\n' * 20,
+    "app/util.py": "def helper(value):\n    return value * 2\n" * 30,
+    "app/notes.md": "Notes on the app.\n" * 40,
+    "lib/copy_a.txt": "shared content\n" * 25,
+    "lib/copy_b.txt": "shared content\n" * 25,
+    "lib/unicode.txt": "café ☃\n" * 30,
+    "lib/windows.txt": "line one\r\nline two\r\n" * 20,
+    "lib/deep/values.json": '{"key": "value"}\n' * 40,
+    "docs/guide.md": "A guide.\n\n\n\nWith blank lines.   \n" * 15,
+}
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as file:
+        file.write(text)
+    # Move the mtime on, so a rewrite within the filesystem's timestamp granularity still counts as a change
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+@pytest.fixture
+def repo(tmp_path):
+    source = tmp_path / "repo"
+    for name, text in FILES.items():
+        write(str(source / name), text)
+    return str(source)
+
+def pack(repo, output_dir, **options):
+    options.setdefault("file_size_limit", 2)
+    return rpg.pack_repository([repo], str(output_dir), **options)
+
+def output_files(output_dir):
+    names = sorted(name for name in os.listdir(output_dir) if rpg.CHUNK_FILE.fullmatch(name))
+    names.append(rpg.INDEX_FILE)
+    contents = {}
+    for name in names:
+        with open(os.path.join(output_dir, name), "rb") as file:
+            contents[name] = file.read()
+    return contents
+
+def assert_matches_fresh_run(repo, output_dir, tmp_path, **options):
+    fresh_dir = tmp_path / "fresh"
+    shutil.rmtree(fresh_dir, ignore_errors=True)
+    pack(repo, fresh_dir, **options)
+    assert output_files(output_dir) == output_files(fresh_dir)
+    assert not [name for name in os.listdir(output_dir) if name.endswith(".tmp")]
+
+def change_files(repo):
+    write(os.path.join(repo, "app/util.py"), FILES["app/util.py"] + "def more():\n    return 3\n")
+    write(os.path.join(repo, "app/extra.py"), "def extra():\n    return 4\n" * 10)
+    os.remove(os.path.join(repo, "lib/deep/values.json"))
+    shutil.copy(os.path.join(repo, "app/notes.md"), os.path.join(repo, "docs/notes_copy.md"))
+
+OPTIONS = [
+    {},
+    {"minify": True},
+    {"deduplicate": False},
+    {"token_budget": 300},
+    {"file_size_limit": 1},
+]
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_rerun_without_changes_reuses_every_chunk(repo, tmp_path, capsys, options):
+    output_dir = tmp_path / "output"
+    pack(repo, output_dir, **options)
+    capsys.readouterr()
+    pack(repo, output_dir, **options)
+    assert "has been written to" not in capsys.readouterr().out
+    assert_matches_fresh_run(repo, output_dir, tmp_path, **options)
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_rerun_after_changes_matches_fresh_run(repo, tmp_path, options):
+    output_dir = tmp_path / "output"
+    pack(repo, output_dir, **options)
+    change_files(repo)
+    pack(repo, output_dir, **options)
+    assert_matches_fresh_run(repo, output_dir, tmp_path, **options)
+
+@pytest.mark.parametrize("before, after", [
+    ({}, {"minify": True}),
+    ({"minify": True}, {}),
+    ({}, {"deduplicate": False}),
+    ({"deduplicate": False}, {}),
+    ({"token_budget": 300}, {}),
+    ({}, {"token_budget": 300}),
+    ({"file_size_limit": 4}, {"file_size_limit": 1}),
+    ({"file_size_limit": 1}, {"file_size_limit": 4}),
+    ({"minify": True, "file_size_limit": 1}, {"file_size_limit": 4}),
+])
+def test_rerun_with_other_options_matches_fresh_run(repo, tmp_path, before, after):
+    output_dir = tmp_path / "output"
+    pack(repo, output_dir, **before)
+    change_files(repo)
+    pack(repo, output_dir, **after)
+    assert_matches_fresh_run(repo, output_dir, tmp_path, **after)
+
+def test_stale_manifest_is_not_trusted(repo, tmp_path):
+    # A manifest from an earlier run describes chunks that have since been replaced
+    output_dir = tmp_path / "output"
+    manifest_path = output_dir / rpg.MANIFEST_FILE
+    pack(repo, output_dir)
+    stale_manifest = manifest_path.read_bytes()
+    write(os.path.join(repo, "app/main.py"), FILES["app/main.py"] * 2)
+    pack(repo, output_dir)
+    manifest_path.write_bytes(stale_manifest)
+    write(os.path.join(repo, "lib/unicode.txt"), FILES["lib/unicode.txt"] + "more\n")
+    pack(repo, output_dir)
+    assert_matches_fresh_run(repo, output_dir, tmp_path)
+
+@pytest.mark.parametrize("corrupt", ["edit", "truncate", "delete"])
+def test_corrupted_previous_chunk_is_not_copied(repo, tmp_path, corrupt):
+    output_dir = tmp_path / "output"
+    pack(repo, output_dir)
+    chunk_path = output_dir / "knowledge_1.txt"
+    data = chunk_path.read_bytes()
+    if corrupt == "edit":
+        chunk_path.write_bytes(data.replace(b"e", b"E"))  # Same size, different bytes
+    elif corrupt == "truncate":
+        chunk_path.write_bytes(data[:len(data) // 2])
+    else:
+        chunk_path.unlink()
+    # A change in the first chunk shifts every chunk after it, so they are all rebuilt from the previous ones
+    write(os.path.join(repo, "app/main.py"), FILES["app/main.py"] + "# One more line\n")
+    pack(repo, output_dir)
+    assert_matches_fresh_run(repo, output_dir, tmp_path)
+
+def test_index_and_manifest_are_removed_before_chunks_are_replaced(repo, tmp_path, monkeypatch):
+    output_dir = tmp_path / "output"
+    pack(repo, output_dir)
+    write(os.path.join(repo, "app/main.py"), FILES["app/main.py"] + "# One more line\n")
+
+    def interrupted(source, destination):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(rpg.os, "replace", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        pack(repo, output_dir)
+    assert not (output_dir / rpg.MANIFEST_FILE).exists()
+    assert not (output_dir / rpg.INDEX_FILE).exists()
+    monkeypatch.undo()
+    pack(repo, output_dir)
+    assert_matches_fresh_run(repo, output_dir, tmp_path)
+
+def test_lookup_index_serves_packed_content(repo, tmp_path):
+    output_dir = tmp_path / "output"
+    pack(repo, output_dir)
+    change_files(repo)
+    pack(repo, output_dir, deduplicate=False)
+    knowledge_index = rpg.load_knowledge_index(str(output_dir))
+    path = os.path.join(repo, "lib/windows.txt")
+    assert rpg.read_packed_file(str(output_dir), path, knowledge_index) == FILES["lib/windows.txt"].replace("\r\n", "\n")
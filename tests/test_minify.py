@@ -0,0 +1,109 @@
+import ast
+import inspect
+import json
+import textwrap
+
+import pytest
+
+import repo_prompt_generator as rpg
+
+PYTHON_SOURCE = textwrap.dedent('''\
+    """Module docstring."""
+    # A comment
+    import os  # Trailing comment
+
+
+    class Empty:
+        """Only a docstring."""
+
+
+    class Documented:
+        """Docstring before code."""
+
+        value = "# not a comment"
+
+        def method(self):
+            """Only a docstring."""
+
+        def other(self):
+            text = """
+            # kept: inside a string
+            """
+            return text
+
+
+    def formatted(name):
+        f"""Not a docstring: {name}"""
+        return name
+
+
+    if os.sep:
+        "Only statement of an if block"
+    else:
+        pass
+''')
+
+def test_python_output_parses():
+    minified = rpg.minify_python(PYTHON_SOURCE)
+    ast.parse(minified)
+    assert "A comment" not in minified
+    assert "Trailing comment" not in minified
+    assert "Docstring before code" not in minified
+    assert "Module docstring" not in minified
+    assert '"# not a comment"' in minified
+    assert "# kept: inside a string" in minified
+
+@pytest.mark.parametrize("module", [ast, inspect, json.decoder, textwrap])
+def test_python_standard_library_still_parses(module):
+    with open(module.__file__, "r", encoding="utf-8") as file:
+        source = file.read()
+    minified = rpg.minify_python(source)
+    assert ast.dump(ast.parse(minified)).count("FunctionDef") == ast.dump(ast.parse(source)).count("FunctionDef")
+
+def test_python_only_docstring_becomes_ellipsis():
+    minified = rpg.minify_python(PYTHON_SOURCE)
+    tree = ast.parse(minified)
+    empty = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "Empty")
+    assert isinstance(empty.body[0], ast.Expr) and empty.body[0].value.value is Ellipsis
+    assert "Only a docstring" not in minified
+    assert "Only statement of an if block" not in minified
+
+def test_python_f_string_is_not_a_docstring():
+    minified = rpg.minify_python(PYTHON_SOURCE)
+    assert 'f"""Not a docstring: {name}"""' in minified
+    assert rpg.minify_python('def f(x):\n    F"{x}"\n') == 'def f(x):\n    F"{x}"'
+    assert rpg.minify_python('def f(x):\n    rf"{x}"\n') == 'def f(x):\n    rf"{x}"'
+
+def test_python_invalid_source_only_gets_whitespace_folding():
+    source = "def broken(:\n    pass   \n\n\n\n"
+    assert rpg.minify_source("broken.py", source) == rpg.fold_whitespace(source)
+
+def test_c_keeps_string_literals():
+    source = 'char *url = "http://example.com/*x*/"; // comment\nchar c = \'/\'; /* block */ int x;\n'
+    assert rpg.minify_c(source) == 'char *url = "http://example.com/*x*/";\nchar c = \'/\';   int x;'
+
+def test_c_removes_line_comment_continued_by_escaped_newline():
+    source = "int a; // comment \\\n still the comment\nint b;\n"
+    assert rpg.minify_c(source) == "int a;\nint b;"
+
+def test_c_keeps_multi_character_literals():
+    source = "char c = '\\x2f'; // comment\nchar d = '\"'; char *s = \"//\";\n"
+    assert rpg.minify_c(source) == "char c = '\\x2f';\nchar d = '\"'; char *s = \"//\";"
+
+def test_go_keeps_raw_strings():
+    source = 'var s = `// not a comment\n/* nor this */`\nvar r = \'/\' // comment\n'
+    assert rpg.minify_go(source) == 'var s = `// not a comment\n/* nor this */`\nvar r = \'/\''
+
+def test_go_line_comments_do_not_continue():
+    source = "x := 1 // comment \\\ny := 2\n"
+    assert rpg.minify_go(source) == "x := 1\ny := 2"
+
+@pytest.mark.parametrize("extension, source", [
+    (".cpp", 'auto s = R"(// kept)";  \n\n\n// kept too\n'),
+    (".h", "// header comment\nint f();   \n"),
+    (".rs", 'let s = r#"/* kept */"#;\n/* outer /* nested */ kept */\n'),
+    (".java", 'String s = """\n    // kept\n    """;\n'),
+    (".js", "const re = /\\/\\*/; // kept\n\n\n"),
+])
+def test_other_languages_only_get_whitespace_folding(extension, source):
+    assert rpg.minify_source("file" + extension, source) == rpg.fold_whitespace(source)